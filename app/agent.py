@@ -5,7 +5,8 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage
 from langgraph.graph import StateGraph, START, END
 from .crud import insert, get_one, get_all, update, patch, delete
-from .config import db, GOOGLE_API_KEY
+from .config import GOOGLE_API_KEY
+from .db import collection_names
 
 llm = ChatGoogleGenerativeAI(
     model="gemini-1.5-flash",
@@ -22,6 +23,8 @@ CRUD_MAP = {
     "delete": delete
 }
 
+ITEM_ID_PATTERN = re.compile(r'id\s*([a-f0-9]{24}|\d+)')
+
 from typing import TypedDict, NotRequired
 
 class CrudState(TypedDict):
@@ -62,8 +65,10 @@ def decide_action(state: CrudState):
         # fallback
         text = state["user_input"].lower()
         state["action"] = next((a for a in CRUD_MAP if a in text), "get_all")
-        state["collection"] = next((c for c in db.list_collection_names() if c in text), db.list_collection_names()[0])
-        state["item_id"] = re.search(r'id\s*([a-f0-9]{24}|\d+)', text).group(1) if re.search(r'id\s*([a-f0-9]{24}|\d+)', text) else None
+        collections = collection_names()
+        state["collection"] = next((c for c in collections if c in text), collections[0])
+        id_match = ITEM_ID_PATTERN.search(text)
+        state["item_id"] = id_match.group(1) if id_match else None
         state["item"] = None
         state["filter"] = {}
         state["projection"] = None
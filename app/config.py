@@ -1,12 +1,103 @@
 import os
-from pymongo import MongoClient
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def env_flag(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
 MONGODB_URI = os.getenv("MONGODB_URI")
 MONGODB_DB = os.getenv("MONGODB_DB")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-client = MongoClient(MONGODB_URI)
-db = client[MONGODB_DB]
+# Shared MongoDB connection pool (app/db.py). Each worker process holds one
+# sync and one async client, so the server sees at most
+# workers * 2 * MONGO_MAX_POOL_SIZE connections
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))  # 0 = no timeout
+# Wire compression offered to the server, e.g. "zstd,zlib" (snappy needs python-snappy)
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")
+MONGO_ZLIB_LEVEL = int(os.getenv("MONGO_ZLIB_LEVEL", "-1"))
+MONGO_APP_NAME = os.getenv("MONGO_APP_NAME", "genai-crud-agent")
+# Seconds a cached list_collection_names() result stays valid
+COLLECTION_CATALOG_TTL = float(os.getenv("COLLECTION_CATALOG_TTL", "60"))
+
+# Optional warmup at startup (app/warmup.py): open WARMUP_CONNECTIONS pooled
+# connections, build the schema validators, load the collection catalog and
+# plan caches, and with WARMUP_LLM also do a token-count call to Gemini so the
+# TLS/gRPC channel is up. GET /ready answers 503 until it has finished.
+WARMUP = env_flag("WARMUP")
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+WARMUP_LLM = env_flag("WARMUP_LLM")
+
+# Planner cache (exact-match on normalized user input)
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "1024"))
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "3600"))
+PLAN_CACHE_PATH = os.getenv("PLAN_CACHE_PATH", "plan_cache.json")
+
+# Learned plan templates keyed by masked query shape (0 TTL = never expire)
+PLAN_TEMPLATE_SIZE = int(os.getenv("PLAN_TEMPLATE_SIZE", "4096"))
+PLAN_TEMPLATE_TTL = float(os.getenv("PLAN_TEMPLATE_TTL", "0"))
+PLAN_TEMPLATE_PATH = os.getenv("PLAN_TEMPLATE_PATH", "plan_templates.json")
+
+# Rule-based plans at or above this confidence skip the LLM (set > 1 to always ask Gemini)
+RULE_PLANNER_THRESHOLD = float(os.getenv("RULE_PLANNER_THRESHOLD", "0.9"))
+
+# Queries planned per Gemini call by /query/batch
+PLAN_BATCH_SIZE = int(os.getenv("PLAN_BATCH_SIZE", "20"))
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "200"))
+
+# Concurrent /query requests that need Gemini are planned together: a batch is
+# sent after PLAN_MICROBATCH_WAIT_MS or once PLAN_MICROBATCH_SIZE requests are waiting
+PLAN_MICROBATCH_SIZE = int(os.getenv("PLAN_MICROBATCH_SIZE", "8"))
+PLAN_MICROBATCH_WAIT_MS = float(os.getenv("PLAN_MICROBATCH_WAIT_MS", "5"))
+
+# Coalesce concurrent single-document writes per collection into bulk writes
+# buffered for WRITE_COALESCE_MS (0 disables)
+WRITE_COALESCE_MS = float(os.getenv("WRITE_COALESCE_MS", "0"))
+WRITE_COALESCE_MAX_BATCH = int(os.getenv("WRITE_COALESCE_MAX_BATCH", "500"))
+WRITE_COALESCE_ORDERED = env_flag("WRITE_COALESCE_ORDERED")
+
+# GET /contacts keyset pagination
+CONTACTS_PAGE_SIZE = int(os.getenv("CONTACTS_PAGE_SIZE", "50"))
+CONTACTS_MAX_PAGE_SIZE = int(os.getenv("CONTACTS_MAX_PAGE_SIZE", "200"))
+
+# get_all: documents returned when the plan has no limit, and the most it may ask for
+GET_ALL_LIMIT = int(os.getenv("GET_ALL_LIMIT", "100"))
+GET_ALL_MAX_LIMIT = int(os.getenv("GET_ALL_MAX_LIMIT", "1000"))
+
+# Documents fetched per cursor round trip when a read is streamed as NDJSON
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+# Pass-through reads for get_one/get_all: "on" keeps documents as raw BSON until
+# they are written to the response, "extjson" also transcodes them with bsonjs
+# (relaxed Extended JSON, e.g. {"$oid": ...}); "off" decodes to dicts as usual
+RAW_BSON_READS = os.getenv("RAW_BSON_READS", "off").lower()
+
+# /query history sink: "jsonl" (rotating append-only file) or "mongo" (capped collection)
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "jsonl").lower()
+HISTORY_PATH = os.getenv("HISTORY_PATH", "crud_history.jsonl")
+HISTORY_MAX_BYTES = int(os.getenv("HISTORY_MAX_BYTES", str(64 * 1024 * 1024)))
+HISTORY_COMPRESS = env_flag("HISTORY_COMPRESS")
+HISTORY_COLLECTION = os.getenv("HISTORY_COLLECTION", "crud_history")
+HISTORY_CAPPED_BYTES = int(os.getenv("HISTORY_CAPPED_BYTES", str(256 * 1024 * 1024)))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "256"))
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+# Per-entry payload: "full" result, "digest" (summary + hash) or "ids" only
+HISTORY_PAYLOAD = os.getenv("HISTORY_PAYLOAD", "digest").lower()
+HISTORY_MAX_IDS = int(os.getenv("HISTORY_MAX_IDS", "100"))
+
+
+def __getattr__(name: str):
+    # `from .config import db` predates app/db.py; hand out the shared database
+    if name == "db":
+        from .db import get_db
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import AsyncMongoClient, MongoClient
+
+from .config import (
+    MONGODB_URI, MONGODB_DB,
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS, MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_COMPRESSORS, MONGO_ZLIB_LEVEL, MONGO_APP_NAME, COLLECTION_CATALOG_TTL,
+)
+
+# One sync and one async client per process, created on first use or by the
+# FastAPI lifespan (connect) and closed by it (close)
+_client: Optional[MongoClient] = None
+_async_client: Optional[AsyncMongoClient] = None
+_lock = threading.Lock()
+
+# (fetched_at, names) from the last list_collection_names()
+_catalog: Optional[Tuple[float, List[str]]] = None
+
+
+def client_options() -> Dict[str, Any]:
+    """Pool, timeout and compression settings shared by both clients"""
+    options: Dict[str, Any] = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS or None,
+        "appname": MONGO_APP_NAME,
+    }
+    compressors = [name.strip() for name in MONGO_COMPRESSORS.split(",") if name.strip()]
+    if compressors:
+        options["compressors"] = compressors
+        if "zlib" in compressors:
+            options["zlibCompressionLevel"] = MONGO_ZLIB_LEVEL
+    return options
+
+
+def database_name() -> str:
+    if not MONGODB_DB:
+        raise ValueError("MONGODB_DB environment variable is not set")
+    return MONGODB_DB
+
+
+def get_client() -> MongoClient:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = MongoClient(MONGODB_URI, **client_options())
+    return _client
+
+
+def get_async_client() -> AsyncMongoClient:
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = AsyncMongoClient(MONGODB_URI, **client_options())
+    return _async_client
+
+
+def get_db():
+    return get_client()[database_name()]
+
+
+def get_async_db():
+    return get_async_client()[database_name()]
+
+
+def _cached_catalog(max_age: float) -> Optional[List[str]]:
+    if _catalog is not None and time.monotonic() - _catalog[0] <= max_age:
+        return _catalog[1]
+    return None
+
+
+def _store_catalog(names: List[str]) -> List[str]:
+    global _catalog
+    _catalog = (time.monotonic(), sorted(names))
+    return _catalog[1]
+
+
+def collection_names(max_age: float = COLLECTION_CATALOG_TTL) -> List[str]:
+    """Collections in the database, cached for max_age seconds"""
+    cached = _cached_catalog(max_age)
+    if cached is not None:
+        return cached
+    return _store_catalog(get_db().list_collection_names())
+
+
+async def acollection_names(max_age: float = COLLECTION_CATALOG_TTL) -> List[str]:
+    cached = _cached_catalog(max_age)
+    if cached is not None:
+        return cached
+    return _store_catalog(await get_async_db().list_collection_names())
+
+
+async def connect() -> None:
+    """Open the async pool at startup; the sync client stays lazy (scripts, crud.py, sync graph)"""
+    await get_async_client().aconnect()
+
+
+async def close() -> None:
+    global _client, _async_client, _catalog
+    with _lock:
+        client, async_client = _client, _async_client
+        _client = _async_client = _catalog = None
+    if async_client is not None:
+        await async_client.close()
+    if client is not None:
+        client.close()
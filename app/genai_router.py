@@ -2,50 +2,147 @@
 
 import os
 import json
-import re
+import asyncio
+import threading
 from dotenv import load_dotenv
-from typing import TypedDict, Optional, Any, Dict, List
-from pymongo import MongoClient
+from typing import TypedDict, Optional, Any, Dict, List, Tuple
 from bson import ObjectId
+from pymongo import ReturnDocument
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import HumanMessage
-from langgraph.graph import StateGraph, START, END
-
-from .schemas.all_schemas import *  # Import all your Pydantic schemas
 from .serializers import serialize_mongodb_doc
+from .utils import find_options
+from .plan_cache import PlanCache
+from .plan_templates import PlanTemplates
+from .batcher import MicroBatcher
+from .write_coalescer import WriteCoalescer
+from .db import get_client, get_async_client, get_db, get_async_db
+from .raw_bson import RAW_READ_MODES, bsonjs, document_id, raw_collection
+from .rule_planner import RulePlanner, parse_field_values, extract_query_filters
+from .validators import SchemaValidators
+from .config import (
+    PLAN_CACHE_SIZE, PLAN_CACHE_TTL, PLAN_CACHE_PATH,
+    PLAN_TEMPLATE_SIZE, PLAN_TEMPLATE_TTL, PLAN_TEMPLATE_PATH,
+    RULE_PLANNER_THRESHOLD, PLAN_BATCH_SIZE,
+    PLAN_MICROBATCH_SIZE, PLAN_MICROBATCH_WAIT_MS,
+    WRITE_COALESCE_MS, WRITE_COALESCE_MAX_BATCH, WRITE_COALESCE_ORDERED,
+    STREAM_BATCH_SIZE, RAW_BSON_READS, GET_ALL_LIMIT, GET_ALL_MAX_LIMIT,
+)
 
 # Load environment variables
 load_dotenv()
-MONGODB_URI = os.getenv("MONGODB_URI")
-MONGODB_DB = os.getenv("MONGODB_DB")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-# MongoDB client
-client = MongoClient(MONGODB_URI)
+# MongoDB clients live in app/db.py: one shared pool per process, opened and
+# closed by the FastAPI lifespan. client/db/async_client/adb remain importable
+# from here through __getattr__ below.
+_write_coalescer: Optional[WriteCoalescer] = None
+
+def get_write_coalescer() -> Optional[WriteCoalescer]:
+    """Optional coalescing of single-document writes into bulk round trips"""
+    global _write_coalescer
+    if WRITE_COALESCE_MS <= 0:
+        return None
+    async_client = get_async_client()
+    # Rebuild after db.close() so buffered writes never target a closed client
+    if _write_coalescer is None or _write_coalescer.client is not async_client:
+        _write_coalescer = WriteCoalescer(
+            async_client, get_async_db(), WRITE_COALESCE_MS, WRITE_COALESCE_MAX_BATCH, WRITE_COALESCE_ORDERED
+        )
+    return _write_coalescer
+
+def awrite_collection(schema: str):
+    """Collection used by the async write nodes; coalesced when enabled"""
+    write_coalescer = get_write_coalescer()
+    return write_coalescer.collection(schema) if write_coalescer else get_async_db()[schema]
+
+if RAW_BSON_READS not in RAW_READ_MODES:
+    raise ValueError(f"RAW_BSON_READS must be one of {', '.join(RAW_READ_MODES)}")
+if RAW_BSON_READS == "extjson" and bsonjs is None:
+    print("RAW_BSON_READS=extjson needs python-bsonjs; relaying raw documents as plain JSON")
+
+def aread_collection(schema: str):
+    """Collection used by the async get_one/get_all nodes; raw BSON documents when enabled"""
+    if RAW_BSON_READS == "off":
+        return get_async_db()[schema]
+    return raw_collection(get_async_db()[schema], extended_json=RAW_BSON_READS == "extjson")
 
-MONGODB_DB = os.getenv("MONGODB_DB")
-if not MONGODB_DB:
-    raise ValueError("MONGODB_DB environment variable is not set")
+# Gemini LLM, built on first use: importing langchain_google_genai dominates boot time
+_llm = None
 
-db = client[MONGODB_DB]
-# Gemini LLM
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    google_api_key=GOOGLE_API_KEY,
-    temperature=0.1
+def get_llm():
+    global _llm
+    if _llm is None:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        _llm = ChatGoogleGenerativeAI(
+            model="gemini-1.5-flash",
+            google_api_key=GOOGLE_API_KEY,
+            temperature=0.1
+        )
+    return _llm
+
+def plan_messages(prompt: str) -> list:
+    from langchain_core.messages import HumanMessage
+    return [HumanMessage(content=prompt)]
+
+# Pydantic schema classes in app/schemas/all_schemas.py, imported on first use
+SCHEMA_CLASSES = (
+    "CategoriesSchema", "ContactsSchema", "SettingsSchema", "CompaniesSchema", "TasksSchema",
+    "PermissionsSchema", "Chat_listsSchema", "LogsSchema", "EmailLogsSchema", "HelpCenterSchema",
+    "FriendsSchema", "StaticPagesSchema", "NotificationsSchema", "ManualLogsSchema", "RolesSchema",
+    "UsersSchema", "ChatsSchema", "JobsSchema", "EmailTemplatesSchema", "AdminsSchema",
 )
+_schema_map: Optional[Dict[str, Any]] = None
 
-# Map schema names to Pydantic classes and MongoDB collections
-SCHEMA_MAP = {
-    cls.__name__.replace("Schema", "").lower(): cls
-    for cls in [
-        CategoriesSchema, ContactsSchema, SettingsSchema, CompaniesSchema, TasksSchema,
-        PermissionsSchema, Chat_listsSchema, LogsSchema, EmailLogsSchema, HelpCenterSchema,
-        FriendsSchema, StaticPagesSchema, NotificationsSchema, ManualLogsSchema, RolesSchema,
-        UsersSchema, ChatsSchema, JobsSchema, EmailTemplatesSchema, AdminsSchema
-    ]
-}
+def get_schema_map() -> Dict[str, Any]:
+    """Map schema names to Pydantic classes and MongoDB collections"""
+    global _schema_map
+    if _schema_map is None:
+        from .schemas import all_schemas
+        _schema_map = {
+            name.replace("Schema", "").lower(): getattr(all_schemas, name)
+            for name in SCHEMA_CLASSES
+        }
+    return _schema_map
+
+# Keys of a planner result that are safe to cache and replay
+PLAN_KEYS = (
+    "action", "schema", "item_id", "item_ids", "item", "query", "upsert",
+    "projection", "sort", "limit", "skip", "hint",
+)
+
+# Exact-match cache of successful LLM plans, warm-started from disk
+plan_cache = PlanCache(maxsize=PLAN_CACHE_SIZE, ttl=PLAN_CACHE_TTL, path=PLAN_CACHE_PATH)
+
+# Parameterized templates so "delete contact id <oid>" only reaches Gemini once
+plan_templates = PlanTemplates(maxsize=PLAN_TEMPLATE_SIZE, ttl=PLAN_TEMPLATE_TTL, path=PLAN_TEMPLATE_PATH)
+
+_plan_caches_loaded = False
+
+def load_plan_caches() -> None:
+    """Load the persisted plan caches once (lifespan startup, or the first plan)"""
+    global _plan_caches_loaded
+    if not _plan_caches_loaded:
+        _plan_caches_loaded = True
+        plan_cache.load()
+        plan_templates.load()
+
+# Keyword planner: answers simple commands locally, and is the fallback when Gemini fails
+_rule_planner: Optional[RulePlanner] = None
+
+def get_rule_planner() -> RulePlanner:
+    global _rule_planner
+    if _rule_planner is None:
+        _rule_planner = RulePlanner({name: cls.model_fields for name, cls in get_schema_map().items()})
+    return _rule_planner
+
+# Per-schema validators, built once (warmup or first write) instead of a model per write
+_validators: Optional[SchemaValidators] = None
+
+def get_validators() -> SchemaValidators:
+    global _validators
+    if _validators is None:
+        _validators = SchemaValidators(get_schema_map())
+    return _validators
 
 # State definition
 class CrudState(TypedDict):
@@ -53,10 +150,21 @@ class CrudState(TypedDict):
     action: str
     schema: str
     item_id: Optional[str]
+    item_ids: Optional[List[str]]  # several records by id, fetched with one $in query
     item: Optional[dict]
     result: Optional[Any]
     query: Optional[dict]
     error: Optional[str]
+    stream: Optional[bool]  # get_all hands back an open cursor instead of a list
+    upsert: Optional[bool]  # patch inserts the document when the filter matches none
+    return_document: Optional[bool]  # patch returns the updated document (post-image)
+    preview: Optional[bool]  # *_many actions only count the documents they would touch
+    # get_all find options, checked against the schema's fields before they reach Mongo
+    projection: Optional[Any]
+    sort: Optional[Any]
+    limit: Optional[int]
+    skip: Optional[int]
+    hint: Optional[Any]
 
 def extract_json_from_text(text: str) -> dict:
     """Extract JSON object from LLM response text"""
@@ -72,76 +180,69 @@ def extract_json_from_text(text: str) -> dict:
     except Exception:
         raise ValueError("Failed to parse JSON from response")
 
-def parse_field_values(user_input: str) -> Dict[str, Any]:
-    """Enhanced field value extraction from natural language"""
-    item = {}
-    
-    # Pattern for key-value pairs with various formats
-    patterns = [
-        r'(?:set|create|add|with)\s+([\w_]+)\s+(?:to\s+|as\s+|=\s*|:\s*)(["\']?[^,\n]+["\']?)',
-        r'([\w_]+)\s*[:=]\s*(["\']?[^,\n]+["\']?)',
-        r'(name|email|phone|title|description|status)\s+(?:is\s+)?(["\']?[^,\n]+["\']?)',
-        r'([\w_]+)\s+to\s+(["\']?[^,\n]+["\']?)',
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, user_input, re.IGNORECASE)
-        for field, value in matches:
-            # Clean up the value
-            value = value.strip().strip('"\'')
-            # Try to convert to appropriate type
-            if value.lower() in ['true', 'false']:
-                item[field] = value.lower() == 'true'
-            elif value.isdigit():
-                item[field] = int(value)
-            elif re.match(r'^\d+\.\d+$', value):
-                item[field] = float(value)
-            else:
-                item[field] = value
-    
-    return item
+def extract_json_array_from_text(text: str) -> list:
+    """Extract JSON array from LLM response text"""
+    try:
+        start_idx = text.find('[')
+        end_idx = text.rfind(']') + 1
+        if start_idx == -1 or end_idx == 0:
+            raise ValueError("No JSON array found in response")
 
-def extract_query_filters(user_input: str) -> Dict[str, Any]:
-    """Extract query filters from natural language"""
-    query = {}
-    
-    # Email filter
-    email_match = re.search(r'(?:email|mail)\s+(?:is\s+|=\s*)?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', user_input, re.I)
-    if email_match:
-        query["email"] = email_match.group(1)
-    
-    # Name filter
-    name_match = re.search(r'(?:name|called)\s+(?:is\s+|=\s*)?["\']?([^"\']+)["\']?', user_input, re.I)
-    if name_match:
-        query["name"] = {"$regex": name_match.group(1), "$options": "i"}
-    
-    # Status filter
-    status_match = re.search(r'status\s+(?:is\s+|=\s*)?([a-zA-Z]+)', user_input, re.I)
-    if status_match:
-        query["status"] = status_match.group(1)
-    
-    # ID filter
-    id_match = re.search(r'(?:id|_id)\s+(?:is\s+|=\s*)?([a-f0-9]{24})', user_input, re.I)
-    if id_match:
-        query["_id"] = ObjectId(id_match.group(1))
-
-    # 🔹 New: detect "contact Nisha", "user John", etc.
-    entity_match = re.search(r'(?:user|contact|customer|employee)\s+([A-Za-z0-9_]+)', user_input, re.I)
-    if entity_match:
-        query["name"] = {"$regex": entity_match.group(1), "$options": "i"}
-    
-    return query
+        parsed = json.loads(text[start_idx:end_idx])
+        if not isinstance(parsed, list):
+            raise ValueError("Response is not a JSON array")
+        return parsed
+    except Exception:
+        raise ValueError("Failed to parse JSON array from response")
 
-def decide_crud_action(state: CrudState):
-    """Enhanced CRUD action decision with better fallback handling"""
-    
-    # Enhanced prompt for Gemini
-    prompt = f"""
+def template_plan(user_input: str) -> Optional[dict]:
+    """A filled plan template, checked like an LLM plan; None unless it names a known action and schema"""
+    plan = plan_templates.lookup(user_input)
+    if plan is None or plan.get("schema") not in get_schema_map() or plan.get("action") not in SYNC_NODES:
+        return None
+    return normalize_plan(plan)
+
+
+def plan_without_llm(state: CrudState):
+    """Try the plan cache, learned templates and the rule planner, cheapest first.
+
+    Returns (resolved, rule_plan, confidence); the rule plan doubles as the
+    fallback when the LLM call fails.
+    """
+    load_plan_caches()
+    # Replay a cached plan for input we have already sent to Gemini
+    cached_plan = plan_cache.get(state["user_input"])
+    if cached_plan is not None:
+        state.update(cached_plan)
+        state["error"] = None
+        return True, cached_plan, 1.0
+
+    # Same query shape with different literals: fill the learned template
+    templated_plan = template_plan(state["user_input"])
+    if templated_plan is not None:
+        state.update(templated_plan)
+        state["error"] = None
+        plan_cache.put(state["user_input"], templated_plan)
+        return True, templated_plan, 1.0
+
+    # Unambiguous commands ("delete contact id <oid>") never need the LLM
+    rule_plan, confidence = get_rule_planner().plan(state["user_input"])
+    if confidence >= RULE_PLANNER_THRESHOLD:
+        state.update(rule_plan)
+        state["error"] = None
+        return True, rule_plan, confidence
+
+    return False, rule_plan, confidence
+
+
+def plan_instructions() -> str:
+    """Shared part of the planner prompts: actions, schemas and extraction rules"""
+    return f"""
     You are an expert in MongoDB and Pydantic schemas.
     Analyze the user's natural language query and determine the CRUD operation details.
 
-    Available actions: ["insert", "get_one", "get_all", "update", "patch", "delete"]
-    Available schemas: {list(SCHEMA_MAP.keys())}
+    Available actions: ["insert", "get_one", "get_all", "update", "patch", "delete", "update_many", "patch_many", "delete_many"]
+    Available schemas: {list(get_schema_map().keys())}
 
     Rules:
     1. "insert"/"create": Creating new records
@@ -150,403 +251,786 @@ def decide_crud_action(state: CrudState):
     4. "update": Full document replacement (prefer item_id if provided, otherwise query filter)
     5. "patch": Partial update (prefer item_id if provided, otherwise query filter)
     6. "delete": Remove records (prefer item_id if provided, otherwise query filter)
+    7. "patch_many"/"update_many"/"delete_many": The same for every record matching `query`
+       (e.g. "mark all tasks of job X as done"); use them instead of the single-record actions
+       whenever the user means all matching records
 
     Extraction rules:
     - If user mentions an entity without an ID (e.g., "contact Nisha"), create query {{ "name": {{ "$regex": "Nisha", "$options": "i" }} }}
     - If user mentions fields to change (e.g., "message to helloooo", "update age to 30"), fill `item` with those key-value pairs
+    - To insert several records at once, make `item` a list of objects
     - Always output both `item` (fields to update/insert) and `query` (filter conditions) even if item_id is not given
     - If ID is explicitly provided, fill `item_id` and also fill `query` if available
+    - For get_all, only use field names from the schema in `projection`, `sort` and `hint`
     - Avoid making assumptions beyond what the user query specifies
 
-    Return a single valid JSON object with the following keys:
-    {{
+    """
+
+
+# Shape of one plan, as requested from Gemini
+PLAN_OBJECT_SPEC = """{
         "action": "one of the actions above",
         "schema": "collection name from available schemas",
         "item_id": "ObjectId string if targeting specific record, null otherwise",
+        "item_ids": "list of ObjectId strings if the user names several records by id (get_one/get_all), null otherwise",
         "item": "object with fields for insert/update/patch operations, null otherwise",
-        "query": "MongoDB query object for filtering (for get_all/get_one/update/patch/delete), null otherwise"
-    }}
+        "query": "MongoDB query object for filtering (for get_all/get_one/update/patch/delete), null otherwise",
+        "upsert": "true if a patch should create the record when none matches (e.g. 'or create it'), false otherwise",
+        "projection": "get_all only: list of field names to return (e.g. ["name", "email"]), null for all fields",
+        "sort": "get_all only: list of [field, 1 or -1] pairs (e.g. [["createdAt", -1]] for newest first), null otherwise",
+        "limit": "get_all only: maximum number of records (e.g. 5 for 'top 5'), null otherwise",
+        "skip": "get_all only: number of records to skip (e.g. for 'the next 10'), null otherwise",
+        "hint": "get_all only: index name or [[field, 1 or -1]] key pattern if the user names an index, null otherwise"
+    }"""
+
 
-    User Query: {state['user_input']}
+def build_plan_prompt(user_input: str) -> str:
+    """Enhanced prompt for Gemini"""
+    prompt = f"""{plan_instructions()}
+    Return a single valid JSON object with the following keys:
+    {PLAN_OBJECT_SPEC}
+
+    User Query: {user_input}
     """
-    
-    try:
-        response = llm.invoke([HumanMessage(content=prompt)])
-        content = response.content
-        if isinstance(content, list):  # handle structured output
-            response_text = " ".join([c.get("text", "") for c in content if isinstance(c, dict)])
-        else:
-            response_text = str(content)
+    return prompt
 
-        response_text = response_text.strip()
-        arguments = extract_json_from_text(response_text)
-        
-        # Validate required keys
-        if "action" not in arguments or "schema" not in arguments:
-            raise ValueError("Missing required keys in Gemini response")
-        
-        # Ensure valid schema
-        if arguments["schema"] not in SCHEMA_MAP:
-            # Try to find closest match
-            schema_found = False
-            for schema_name in SCHEMA_MAP.keys():
-                if schema_name in arguments["schema"].lower():
-                    arguments["schema"] = schema_name
-                    schema_found = True
-                    break
-            if not schema_found:
-                arguments["schema"] = "users"  # Default fallback
-        
-        # Set defaults for missing optional fields
-        if arguments["action"] == "get_all" and "query" not in arguments:
-            arguments["query"] = {}
-        
-        state.update(arguments)
-        state["error"] = None
-        return state
-        
-    except Exception as e:
-        # Enhanced fallback parsing
-        user_input = state["user_input"].lower()
-        state["error"] = f"Gemini parsing failed: {str(e)}, using fallback"
-        
-        # Detect action with better keyword matching
-        if any(keyword in user_input for keyword in ["create", "add", "insert", "new", "register"]):
-            state["action"] = "insert"
-        elif any(keyword in user_input for keyword in ["update all", "replace", "overwrite"]):
-            state["action"] = "update"
-        elif any(keyword in user_input for keyword in ["update", "modify", "change", "edit", "patch", "set"]):
-            state["action"] = "patch"
-        elif any(keyword in user_input for keyword in ["delete", "remove", "destroy", "drop"]):
-            state["action"] = "delete"
-        elif any(keyword in user_input for keyword in ["list", "get all", "show all", "fetch all", "find all"]):
-            state["action"] = "get_all"
-        elif any(keyword in user_input for keyword in ["get", "find", "show", "fetch"]):
-            if "all" in user_input:
-                state["action"] = "get_all"
-            else:
-                state["action"] = "get_one"
-        else:
-            state["action"] = "get_all"  # Default fallback
-        
-        # Detect schema with improved matching
-        state["schema"] = ""
-        if state["schema"] == "":
-            raise ValueError("Schema is not set in state, cannot proceed with fallback")
-        for schema_name in SCHEMA_MAP.keys():
-            # Check for exact match or plural forms
-            if (schema_name in user_input or 
-                f"{schema_name}s" in user_input or 
-                schema_name.rstrip('s') in user_input):
-                state["schema"] = schema_name
-                break
-        
-        if not state["schema"]:
-            state["schema"] = "users"  # Default fallback
-        
-        # Extract item_id
-        id_patterns = [
-            r'(?:id|_id)\s+([a-f0-9]{24})',
-            r'with\s+id\s+([a-f0-9]{24})',
-            r'([a-f0-9]{24})',  # Standalone ObjectId
-        ]
-        
-        state["item_id"] = None
-        for pattern in id_patterns:
-            id_match = re.search(pattern, user_input)
-            if id_match:
-                state["item_id"] = id_match.group(1)
+
+def build_batch_plan_prompt(user_inputs: List[str]) -> str:
+    """One prompt asking Gemini for a plan per query, as a JSON array"""
+    numbered = "\n".join(f"    {index}. {text}" for index, text in enumerate(user_inputs, 1))
+    prompt = f"""{plan_instructions()}
+    The user sent {len(user_inputs)} independent queries, from different users. Plan each
+    one on its own: text in one query never changes the plan of another.
+    Return a single valid JSON array with exactly {len(user_inputs)} objects, in the same
+    order as the queries, each with an "index" key holding the query's number
+    and the following keys:
+    {PLAN_OBJECT_SPEC}
+
+    User Queries:
+{numbered}
+    """
+    return prompt
+
+
+def response_text(response) -> str:
+    """Flatten a chat model response into plain text"""
+    content = response.content
+    if isinstance(content, list):  # handle structured output
+        return " ".join([c.get("text", "") for c in content if isinstance(c, dict)]).strip()
+    return str(content).strip()
+
+
+def normalize_plan(arguments: dict) -> dict:
+    """Validate an LLM plan and coerce the schema name onto a known collection"""
+    # Validate required keys
+    if "action" not in arguments or "schema" not in arguments:
+        raise ValueError("Missing required keys in Gemini response")
+
+    # Ensure valid schema
+    if arguments["schema"] not in get_schema_map():
+        # Try to find closest match
+        schema_found = False
+        for schema_name in get_schema_map().keys():
+            if schema_name in arguments["schema"].lower():
+                arguments["schema"] = schema_name
+                schema_found = True
                 break
-        
-        # Extract item data for create/update/patch operations
-        if state["action"] in ["insert", "update", "patch"]:
-            state["item"] = parse_field_values(state["user_input"])
-        else:
-            state["item"] = None
-        
-        # Extract query filters for get operations
-        if state["action"] in ["get_all", "get_one"] and not state["item_id"]:
-            state["query"] = extract_query_filters(state["user_input"])
-        else:
-            state["query"] = {}
-        
-        return state
+        if not schema_found:
+            arguments["schema"] = "users"  # Default fallback
 
-# Route decision
-def route_decision(state: CrudState):
-    return state["action"]
+    # Set defaults for missing optional fields
+    if arguments["action"] == "get_all" and "query" not in arguments:
+        arguments["query"] = {}
 
-# Enhanced CRUD functions with better error handling
-def insert_item(state: CrudState):
-    """Create new item with validation"""
-    try:
-        schema = state["schema"]
-        item = state.get("item", {})
-        
-        if not item:
-            state["result"] = {"error": "No item data provided for insertion"}
-            return state
-        
-        # Validate against Pydantic schema
-        cls = SCHEMA_MAP[schema]
-        validated = cls(**item).dict(exclude_unset=True)
-        
-        # Insert into MongoDB
-        result = db[schema].insert_one(validated)
-        state["result"] = {
-            "success": True,
-            "inserted_id": str(result.inserted_id),
-            "action": "insert",
-            "schema": schema
-        }
-        
-    except Exception as e:
-        state["result"] = {
-            "success": False,
-            "error": f"Insert failed: {str(e)}",
-            "action": "insert",
-            "schema": state["schema"]
-        }
-    
+    return arguments
+
+
+def apply_llm_plan(state: CrudState, arguments: dict, learn: bool = True):
+    """Store a validated LLM plan on the state and, if learn, teach the caches about it"""
+    state.update(arguments)
+    state["error"] = None
+    if learn:
+        plan = {key: arguments[key] for key in PLAN_KEYS if key in arguments}
+        plan_cache.put(state["user_input"], plan)
+        plan_templates.learn(state["user_input"], plan)
     return state
 
-def get_one_item(state: CrudState):
-    """Get single item by ID or query"""
-    try:
-        schema = state["schema"]
-        item_id = state.get("item_id")
-        query = state.get("query", {})
-        
-        if item_id:
-            doc = db[schema].find_one({"_id": ObjectId(item_id)})
-        elif query:
-            doc = db[schema].find_one(query)
-        else:
-            state["result"] = {"error": "No ID or query provided for get_one operation"}
-            return state
-        
-        if doc:
-            state["result"] = {
-                "success": True,
-                "data": serialize_mongodb_doc(doc),
-                "action": "get_one",
-                "schema": schema
-            }
-        else:
-            state["result"] = {
-                "success": False,
-                "error": "Document not found",
-                "action": "get_one",
-                "schema": schema
-            }
-            
-    except Exception as e:
+
+# The only actions an unconfirmed rule-planner guess may run
+READ_ACTIONS = ("get_one", "get_all")
+
+def apply_fallback_plan(state: CrudState, rule_plan: dict, confidence: float, error: Exception):
+    """Fall back to the rule planner's guess when Gemini fails.
+
+    Reads run however unsure the guess is; a write (insert, update, patch,
+    delete, *_many) is never run on a guess and fails with the Gemini error.
+    """
+    state.update(rule_plan)
+    state["error"] = f"Gemini parsing failed: {str(error)}, using fallback (confidence {confidence})"
+    if rule_plan["action"] not in READ_ACTIONS:
         state["result"] = {
             "success": False,
-            "error": f"Get one failed: {str(e)}",
-            "action": "get_one",
-            "schema": state["schema"]
+            "error": f"Gemini planning failed: {str(error)}; not running a {rule_plan['action']} "
+                     f"guessed with confidence {confidence}",
+            "action": rule_plan["action"],
+            "schema": rule_plan["schema"]
         }
-    
     return state
 
-def get_all_items(state: CrudState):
-    """Get multiple items with optional filtering"""
+
+def decide_crud_action(state: CrudState):
+    """Enhanced CRUD action decision with better fallback handling"""
+    if state.get("action"):
+        return state  # already planned (e.g. by the batch planner)
+
+    resolved, rule_plan, confidence = plan_without_llm(state)
+    if resolved:
+        return state
+
     try:
-        schema = state["schema"]
-        query = state.get("query", {})
-        
-        # Add pagination support
-        limit = 100  # Default limit
-        docs = list(db[schema].find(query).limit(limit))
-        
-        # Serialize documents
-        serialized_docs = [serialize_mongodb_doc(doc) for doc in docs]
-        
-        state["result"] = {
-            "success": True,
-            "data": serialized_docs,
-            "count": len(serialized_docs),
-            "action": "get_all",
-            "schema": schema,
-            "query": query
-        }
-        
+        response = get_llm().invoke(plan_messages(build_plan_prompt(state["user_input"])))
+        arguments = normalize_plan(extract_json_from_text(response_text(response)))
+        return apply_llm_plan(state, arguments)
     except Exception as e:
-        state["result"] = {
-            "success": False,
-            "error": f"Get all failed: {str(e)}",
-            "action": "get_all",
-            "schema": state["schema"]
-        }
-    
-    return state
+        return apply_fallback_plan(state, rule_plan, confidence, e)
+
+
+async def adecide_crud_action(state: CrudState):
+    """Async variant of decide_crud_action; awaits Gemini instead of blocking a thread"""
+    if state.get("action"):
+        return state  # already planned (e.g. by the batch planner)
+
+    resolved, rule_plan, confidence = plan_without_llm(state)
+    if resolved:
+        return state
+
+    # Share the Gemini call with whatever other requests are planning right now
+    if plan_batcher is not None:
+        return await plan_batcher.submit(state)
 
-def update_item(state: CrudState):
-    """Full document replacement (by id or query)"""
     try:
-        schema = state["schema"]
-        item_id = state.get("item_id")
-        query = state.get("query", {})
-        item = state.get("item", {})
+        response = await get_llm().ainvoke(plan_messages(build_plan_prompt(state["user_input"])))
+        arguments = normalize_plan(extract_json_from_text(response_text(response)))
+        return apply_llm_plan(state, arguments)
+    except Exception as e:
+        return apply_fallback_plan(state, rule_plan, confidence, e)
+
+def batch_plan_prompt(states: List[CrudState]) -> str:
+    if len(states) == 1:
+        # A batch of one is just a normal plan; keep the simpler prompt
+        return build_plan_prompt(states[0]["user_input"])
+    return build_batch_plan_prompt([state["user_input"] for state in states])
 
-        if not item:
-            state["result"] = {"error": "No item data provided for update operation"}
-            return state
 
-        # Validate against Pydantic schema
-        cls = SCHEMA_MAP[schema]
-        validated = cls(**item).dict(exclude_unset=True)
+def apply_batch_plans(states: List[CrudState], response: Any = None, error: Optional[Exception] = None) -> List[CrudState]:
+    """Give each state its plan from a batch response, or the rule-planner
+    fallback if the response is unusable for it.
 
-        # Choose filter
-        if item_id:
-            filter_ = {"_id": ObjectId(item_id)}
-        elif query:
-            filter_ = query
+    In a multi-query batch each plan must echo its query's index, and the
+    plans are not cached: the queries may come from unrelated clients.
+    """
+    try:
+        if error is not None:
+            raise error
+        if len(states) == 1:
+            plans = [extract_json_from_text(response_text(response))]
         else:
-            state["result"] = {"error": "No item ID or query provided for update operation"}
-            return state
+            plans = extract_json_array_from_text(response_text(response))
+        if len(plans) != len(states):
+            raise ValueError(f"Expected {len(states)} plans, got {len(plans)}")
+    except Exception as e:
+        plans = [e] * len(states)
 
-        # Update in MongoDB
-        result = db[schema].replace_one(filter_, validated)
+    batched = len(states) > 1
+    for index, (state, plan) in enumerate(zip(states, plans), 1):
+        rule_plan, confidence = get_rule_planner().plan(state["user_input"])
+        try:
+            if isinstance(plan, Exception):
+                raise plan
+            if not isinstance(plan, dict):
+                raise ValueError("Plan is not a JSON object")
+            if batched and plan.pop("index", None) != index:
+                # Reordered or merged: this plan may belong to another client's query
+                raise ValueError(f"Plan does not echo query index {index}")
+            apply_llm_plan(state, normalize_plan(plan), learn=not batched)
+        except Exception as e:
+            apply_fallback_plan(state, rule_plan, confidence, e)
+    return states
+
+
+def plan_batch(states: List[CrudState]) -> List[CrudState]:
+    """Plan several states with a single Gemini call"""
+    try:
+        response = get_llm().invoke(plan_messages(batch_plan_prompt(states)))
+    except Exception as e:
+        return apply_batch_plans(states, error=e)
+    return apply_batch_plans(states, response)
 
-        state["result"] = {
-            "success": True,
-            "matched_count": result.matched_count,
-            "modified_count": result.modified_count,
-            "action": "update",
-            "schema": schema,
-            "filter_used": filter_
-        }
 
+async def aplan_batch(states: List[CrudState]) -> List[CrudState]:
+    """Async plan_batch, also used by the /query micro-batcher"""
+    try:
+        response = await get_llm().ainvoke(plan_messages(batch_plan_prompt(states)))
     except Exception as e:
-        state["result"] = {
+        return apply_batch_plans(states, error=e)
+    return apply_batch_plans(states, response)
+
+
+def _needs_llm(states: List[CrudState], batch_size: int) -> List[List[CrudState]]:
+    """Resolve what the cache/template/rule tiers can; batch the rest for the LLM"""
+    pending = []
+    for state in states:
+        resolved, _, _ = plan_without_llm(state)
+        if not resolved:
+            pending.append(state)
+    return [pending[i:i + batch_size] for i in range(0, len(pending), max(1, batch_size))]
+
+
+def plan_queries(states: List[CrudState], batch_size: int = PLAN_BATCH_SIZE) -> List[CrudState]:
+    """Plan many states: cache/template/rule tiers first, then one LLM call per batch_size misses"""
+    for batch in _needs_llm(states, batch_size):
+        plan_batch(batch)
+    return states
+
+
+async def aplan_queries(states: List[CrudState], batch_size: int = PLAN_BATCH_SIZE) -> List[CrudState]:
+    """Async plan_queries; the batches' LLM calls run concurrently"""
+    await asyncio.gather(*(aplan_batch(batch) for batch in _needs_llm(states, batch_size)))
+    return states
+
+
+# Server-side micro-batching of concurrent LLM plans (size 1 disables it)
+plan_batcher = (
+    MicroBatcher(aplan_batch, PLAN_MICROBATCH_SIZE, PLAN_MICROBATCH_WAIT_MS)
+    if PLAN_MICROBATCH_SIZE > 1 else None
+)
+
+
+def new_crud_state(user_input: str) -> CrudState:
+    return CrudState(
+        user_input=user_input,
+        action="",
+        schema="",
+        item_id=None,
+        item_ids=None,
+        item=None,
+        result=None,
+        query=None,
+        error=None,
+        stream=False,
+        upsert=False,
+        return_document=False,
+        preview=False
+    )
+
+
+# Route decision
+def route_decision(state: CrudState):
+    # Planning already produced the result (a refused fallback write): nothing to run
+    if state.get("result") is not None:
+        return "finish"
+    return state["action"]
+
+# CRUD nodes. Filter selection, validation and result building live in the
+# helpers below, shared by the sync nodes and their async twins, which only
+# differ in the driver call (MongoClient vs awaited AsyncMongoClient).
+class MissingInput(Exception):
+    """The plan lacks what a node needs; reported as a bare {"error": ...} result"""
+
+
+def node_failed(state: CrudState, action: str, error: Exception, label: Optional[str] = None) -> dict:
+    label = label or f"{action.replace('_', ' ').capitalize()} failed"
+    return {
+        "success": False,
+        "error": f"{label}: {str(error)}",
+        "action": action,
+        "schema": state["schema"]
+    }
+
+def target_filter(state: CrudState, missing: str) -> dict:
+    """item_id when given, otherwise the plan's query"""
+    item_id = state.get("item_id")
+    query = state.get("query", {})
+    if item_id:
+        return {"_id": ObjectId(item_id)}
+    if query:
+        return query
+    raise MissingInput(missing)
+
+def equality_fields(filter_: dict) -> dict:
+    """The filter's plain field == value conditions, which an upsert copies into the new document"""
+    return {
+        key: value for key, value in filter_.items()
+        if not key.startswith("$") and not (isinstance(value, dict) and any(str(k).startswith("$") for k in value))
+    }
+
+def insert_documents(state: CrudState):
+    """The validated document, or a list of them for insert_many"""
+    item = state.get("item", {})
+    if not item:
+        raise MissingInput("No item data provided for insertion")
+    # A list of items is validated in one call
+    if isinstance(item, list):
+        return get_validators().validate_many(state["schema"], item)
+    return get_validators().validate(state["schema"], item)
+
+def insert_result(state: CrudState, result, many: bool = False) -> dict:
+    if many:
+        inserted = {"inserted_ids": [str(inserted_id) for inserted_id in result.inserted_ids]}
+    else:
+        inserted = {"inserted_id": str(result.inserted_id)}
+    return {"success": True, **inserted, "action": "insert", "schema": state["schema"]}
+
+def get_one_result(state: CrudState, doc, raw: bool = False) -> dict:
+    if not doc:
+        return {
             "success": False,
-            "error": f"Update failed: {str(e)}",
-            "action": "update",
+            "error": "Document not found",
+            "action": "get_one",
             "schema": state["schema"]
         }
+    return {
+        "success": True,
+        # Raw documents are written to the response as-is
+        "data": doc if raw else serialize_mongodb_doc(doc),
+        "action": "get_one",
+        "schema": state["schema"]
+    }
 
-    return state
+def get_all_find(state: CrudState) -> Tuple[Any, dict]:
+    """The filter and the find() options; projection, sort, limit, skip and hint run on the server"""
+    fields = get_schema_map()[state["schema"]].model_fields
+    if state.get("stream"):
+        # Memory stays flat, so the page-size cap does not apply; only the plan's own limit does
+        options = find_options(state, fields, None, None)
+    else:
+        options = find_options(state, fields, GET_ALL_LIMIT, GET_ALL_MAX_LIMIT)
+    return state.get("query", {}), options
 
+def get_all_result(state: CrudState, query, docs: list, raw: bool = False) -> dict:
+    # Serialize documents (raw documents are written to the response as-is)
+    data = docs if raw else [serialize_mongodb_doc(doc) for doc in docs]
+    return {
+        "success": True,
+        "data": data,
+        "count": len(data),
+        "action": "get_all",
+        "schema": state["schema"],
+        "query": query
+    }
 
-def patch_item(state: CrudState):
-    """Partial document update (by id or query)"""
-    try:
-        schema = state["schema"]
-        item_id = state.get("item_id")
-        query = state.get("query", {})
-        item = state.get("item", {})
+def replacement(state: CrudState) -> Tuple[dict, dict]:
+    """Filter and validated replacement document for update (full document replacement)"""
+    item = state.get("item", {})
+    if not item:
+        raise MissingInput("No item data provided for update operation")
+    validated = get_validators().validate(state["schema"], item)
+    return target_filter(state, "No item ID or query provided for update operation"), validated
 
-        if not item:
-            state["result"] = {"error": "No item data provided for patch operation"}
-            return state
+def update_result(state: CrudState, filter_: dict, result) -> dict:
+    return {
+        "success": True,
+        "matched_count": result.matched_count,
+        "modified_count": result.modified_count,
+        "action": "update",
+        "schema": state["schema"],
+        "filter_used": filter_
+    }
 
-        # Choose filter
-        if item_id:
-            filter_ = {"_id": ObjectId(item_id)}
-        elif query:
-            filter_ = query
-        else:
-            state["result"] = {"error": "No item ID or query provided for patch operation"}
-            return state
+def patch_update(state: CrudState) -> Tuple[dict, dict]:
+    """Filter and $set for a patch; only the provided fields are validated, no read of the stored document"""
+    item = state.get("item", {})
+    if not item:
+        raise MissingInput("No item data provided for patch operation")
+    filter_ = target_filter(state, "No item ID or query provided for patch operation")
+    validated = get_validators().validate_partial(state["schema"], item)
+    if not validated:
+        raise MissingInput("No valid fields found for patch operation")
+    if state.get("upsert"):
+        # An upsert may insert: the would-be document gets the same validation as an insert
+        get_validators().validate(state["schema"], {**equality_fields(filter_), **item})
+    return filter_, {"$set": validated}
 
-        # Validate only provided fields
-        cls = SCHEMA_MAP[schema]
-        existing = db[schema].find_one(filter_)
-        if not existing:
-            raise ValueError("Document not found")
+def _patch_summary(state: CrudState, filter_: dict, update: dict) -> dict:
+    return {
+        "success": True,
+        "action": "patch",
+        "schema": state["schema"],
+        "updated_fields": list(update["$set"].keys()),
+        "filter_used": filter_
+    }
 
-        update_data = {**existing, **item}
-        validated = cls(**update_data).dict(include=set(item.keys()))
+def patch_result(state: CrudState, filter_: dict, update: dict, result) -> dict:
+    """Summary of an update_one patch"""
+    if not result.matched_count and result.upserted_id is None:
+        raise ValueError("Document not found")
+    summary = _patch_summary(state, filter_, update)
+    summary.update(matched_count=result.matched_count, modified_count=result.modified_count)
+    if result.upserted_id is not None:
+        summary["upserted_id"] = str(result.upserted_id)
+    return summary
 
-        if not validated:
-            state["result"] = {"error": "No valid fields found for patch operation"}
-            return state
+def patched_document_result(state: CrudState, filter_: dict, update: dict, doc) -> dict:
+    """Summary of a find_one_and_update patch, with the post-image as data"""
+    if doc is None:
+        raise ValueError("Document not found")
+    summary = _patch_summary(state, filter_, update)
+    summary.update(matched_count=1, data=serialize_mongodb_doc(doc))
+    return summary
 
-        # Update in MongoDB
-        result = db[schema].update_one(filter_, {"$set": validated})
+def patch_failed(state: CrudState, error: Exception) -> dict:
+    if isinstance(error, ValueError):
+        return node_failed(state, "patch", error, "Validation error")
+    return node_failed(state, "patch", error)
 
-        state["result"] = {
-            "success": True,
-            "matched_count": result.matched_count,
-            "modified_count": result.modified_count,
-            "action": "patch",
-            "schema": schema,
-            "updated_fields": list(validated.keys()),
-            "filter_used": filter_
-        }
+def delete_result(state: CrudState, filter_: dict, result) -> dict:
+    return {
+        "success": True,
+        "deleted_count": result.deleted_count,
+        "action": "delete",
+        "schema": state["schema"],
+        "filter_used": filter_
+    }
 
-    except ValueError as ve:
-        state["result"] = {
+def ids_filter(item_ids: List[str]) -> Tuple[List[ObjectId], dict]:
+    """The requested ids in input order, and one $in filter for all of them"""
+    ids = [ObjectId(item_id) for item_id in item_ids]
+    return ids, {"_id": {"$in": list(dict.fromkeys(ids))}}
+
+def ids_result(state: CrudState, ids: List[ObjectId], docs: list, raw: bool = False) -> dict:
+    """Documents in the order their ids were asked for, plus the ids that matched nothing"""
+    by_id = {document_id(doc): doc for doc in docs}
+    found = [by_id[_id] for _id in ids if _id in by_id]
+    missing = [str(_id) for _id in ids if _id not in by_id]
+    if not found:
+        return {
             "success": False,
-            "error": f"Validation error: {str(ve)}",
-            "action": "patch",
+            "error": "Documents not found",
+            "missing_ids": missing,
+            "action": state["action"],
             "schema": state["schema"]
         }
+    return {
+        "success": True,
+        # Raw documents are written to the response as-is
+        "data": found if raw else [serialize_mongodb_doc(doc) for doc in found],
+        "count": len(found),
+        "missing_ids": missing,
+        "action": state["action"],
+        "schema": state["schema"]
+    }
+
+# Set-based writes: one server-side command for every document matching the filter
+MANY_ACTIONS = ("update_many", "patch_many", "delete_many")
+
+def many_write(state: CrudState) -> Tuple[dict, Optional[dict]]:
+    """Filter and update for a *_many action (update is None for delete_many)"""
+    item_id = state.get("item_id")
+    filter_ = {"_id": ObjectId(item_id)} if item_id else (state.get("query") or {})
+    if not filter_:
+        # Without a filter the command would touch the whole collection
+        verb = "delete" if state["action"] == "delete_many" else "update"
+        raise ValueError(f"Refusing to {verb} every document without a filter")
+    if state["action"] == "delete_many":
+        return filter_, None
+
+    # $set of the validated item: the whole schema for update_many, only the given fields for patch_many
+    schema = state["schema"]
+    item = state.get("item") or {}
+    if not item:
+        raise ValueError("No item data provided")
+    if state["action"] == "update_many":
+        validated = get_validators().validate(schema, item)
+    else:
+        validated = get_validators().validate_partial(schema, item)
+    if not validated:
+        raise ValueError("No valid fields found")
+    return filter_, {"$set": validated}
+
+def many_result(state: CrudState, filter_: dict, result=None, count: Optional[int] = None) -> dict:
+    summary = {"success": True, "action": state["action"], "schema": state["schema"], "filter_used": filter_}
+    if count is not None:
+        # Preview: what the command would touch, from the same filter (and index)
+        summary.update(preview=True, matched_count=count)
+    elif state["action"] == "delete_many":
+        summary["deleted_count"] = result.deleted_count
+    else:
+        summary.update(matched_count=result.matched_count, modified_count=result.modified_count)
+    return summary
+
+
+# Sync nodes
+def insert_item(state: CrudState):
+    """Create new item with validation"""
+    try:
+        documents = insert_documents(state)
+        collection = get_db()[state["schema"]]
+        if isinstance(documents, list):
+            state["result"] = insert_result(state, collection.insert_many(documents), many=True)
+        else:
+            state["result"] = insert_result(state, collection.insert_one(documents))
+    except MissingInput as e:
+        state["result"] = {"error": str(e)}
     except Exception as e:
-        state["result"] = {
-            "success": False,
-            "error": f"Patch failed: {str(e)}",
-            "action": "patch",
-            "schema": state["schema"]
-        }
+        state["result"] = node_failed(state, "insert", e)
+    return state
+
+def get_items_by_ids(state: CrudState):
+    """get_one/get_all for a list of ids: a single find with $in instead of one find_one each"""
+    ids, filter_ = ids_filter(state["item_ids"])
+    state["result"] = ids_result(state, ids, list(get_db()[state["schema"]].find(filter_)))
+    return state
+
+def get_one_item(state: CrudState):
+    """Get single item by ID or query"""
+    try:
+        if state.get("item_ids"):
+            return get_items_by_ids(state)
+        filter_ = target_filter(state, "No ID or query provided for get_one operation")
+        state["result"] = get_one_result(state, get_db()[state["schema"]].find_one(filter_))
+    except MissingInput as e:
+        state["result"] = {"error": str(e)}
+    except Exception as e:
+        state["result"] = node_failed(state, "get_one", e)
+    return state
 
+def get_all_items(state: CrudState):
+    """Get multiple items with optional filtering"""
+    try:
+        if state.get("item_ids"):
+            return get_items_by_ids(state)
+        query, options = get_all_find(state)
+        docs = list(get_db()[state["schema"]].find(query, **options))
+        state["result"] = get_all_result(state, query, docs)
+    except Exception as e:
+        state["result"] = node_failed(state, "get_all", e)
     return state
 
+def update_item(state: CrudState):
+    """Full document replacement (by id or query)"""
+    try:
+        filter_, validated = replacement(state)
+        result = get_db()[state["schema"]].replace_one(filter_, validated)
+        state["result"] = update_result(state, filter_, result)
+    except MissingInput as e:
+        state["result"] = {"error": str(e)}
+    except Exception as e:
+        state["result"] = node_failed(state, "update", e)
+    return state
 
+def patch_item(state: CrudState):
+    """Partial document update (by id or query) in one round trip"""
+    try:
+        filter_, update = patch_update(state)
+        collection = get_db()[state["schema"]]
+        upsert = bool(state.get("upsert"))
+        if state.get("return_document"):
+            # One round trip that also hands back the post-image
+            doc = collection.find_one_and_update(filter_, update, upsert=upsert, return_document=ReturnDocument.AFTER)
+            state["result"] = patched_document_result(state, filter_, update, doc)
+        else:
+            result = collection.update_one(filter_, update, upsert=upsert)
+            state["result"] = patch_result(state, filter_, update, result)
+    except MissingInput as e:
+        state["result"] = {"error": str(e)}
+    except Exception as e:
+        state["result"] = patch_failed(state, e)
+    return state
 
 def delete_item(state: CrudState):
     """Delete item by ID or query"""
     try:
-        schema = state["schema"]
-        item_id = state.get("item_id")
-        query = state.get("query", {})
-
-        # Choose filter
-        if item_id:
-            filter_ = {"_id": ObjectId(item_id)}
-        elif query:
-            filter_ = query
+        filter_ = target_filter(state, "No item ID or query provided for delete operation")
+        result = get_db()[state["schema"]].delete_one(filter_)
+        state["result"] = delete_result(state, filter_, result)
+    except MissingInput as e:
+        state["result"] = {"error": str(e)}
+    except Exception as e:
+        state["result"] = node_failed(state, "delete", e)
+    return state
+
+def write_many(state: CrudState):
+    """update_many / patch_many / delete_many, or their affected count when previewing"""
+    try:
+        filter_, update = many_write(state)
+        collection = get_db()[state["schema"]]
+        if state.get("preview"):
+            state["result"] = many_result(state, filter_, count=collection.count_documents(filter_))
+        elif update is None:
+            state["result"] = many_result(state, filter_, collection.delete_many(filter_))
         else:
-            state["result"] = {"error": "No item ID or query provided for delete operation"}
+            state["result"] = many_result(state, filter_, collection.update_many(filter_, update))
+    except Exception as e:
+        state["result"] = node_failed(state, state["action"], e)
+    return state
+
+
+# Async nodes: same helpers, awaiting the AsyncMongoClient so one event loop
+# can keep many queries in flight. Single-document writes go through
+# awrite_collection (coalesced when enabled), reads through aread_collection.
+async def ainsert_item(state: CrudState):
+    """Create new item with validation"""
+    try:
+        documents = insert_documents(state)
+        if isinstance(documents, list):
+            # Already one bulk command, so it bypasses the write coalescer
+            result = await get_async_db()[state["schema"]].insert_many(documents)
+            state["result"] = insert_result(state, result, many=True)
+        else:
+            result = await awrite_collection(state["schema"]).insert_one(documents)
+            state["result"] = insert_result(state, result)
+    except MissingInput as e:
+        state["result"] = {"error": str(e)}
+    except Exception as e:
+        state["result"] = node_failed(state, "insert", e)
+    return state
+
+async def aget_items_by_ids(state: CrudState):
+    ids, filter_ = ids_filter(state["item_ids"])
+    docs = await aread_collection(state["schema"]).find(filter_).to_list()
+    state["result"] = ids_result(state, ids, docs, raw=RAW_BSON_READS != "off")
+    return state
+
+async def aget_one_item(state: CrudState):
+    """Get single item by ID or query"""
+    try:
+        if state.get("item_ids"):
+            return await aget_items_by_ids(state)
+        filter_ = target_filter(state, "No ID or query provided for get_one operation")
+        doc = await aread_collection(state["schema"]).find_one(filter_)
+        state["result"] = get_one_result(state, doc, raw=RAW_BSON_READS != "off")
+    except MissingInput as e:
+        state["result"] = {"error": str(e)}
+    except Exception as e:
+        state["result"] = node_failed(state, "get_one", e)
+    return state
+
+async def aget_all_items(state: CrudState):
+    """Get multiple items with optional filtering"""
+    try:
+        if state.get("item_ids"):
+            return await aget_items_by_ids(state)
+        query, options = get_all_find(state)
+        cursor = aread_collection(state["schema"]).find(query, **options)
+
+        if state.get("stream"):
+            # The caller iterates and serializes the documents as they arrive
+            state["result"] = {
+                "success": True,
+                "cursor": cursor.batch_size(STREAM_BATCH_SIZE),
+                "action": "get_all",
+                "schema": state["schema"],
+                "query": query
+            }
             return state
 
-        # Perform delete
-        result = db[schema].delete_one(filter_)
+        state["result"] = get_all_result(state, query, await cursor.to_list(), raw=RAW_BSON_READS != "off")
+    except Exception as e:
+        state["result"] = node_failed(state, "get_all", e)
+    return state
 
-        state["result"] = {
-            "success": True,
-            "deleted_count": result.deleted_count,
-            "action": "delete",
-            "schema": schema,
-            "filter_used": filter_
-        }
+async def aupdate_item(state: CrudState):
+    """Full document replacement (by id or query)"""
+    try:
+        filter_, validated = replacement(state)
+        result = await awrite_collection(state["schema"]).replace_one(filter_, validated)
+        state["result"] = update_result(state, filter_, result)
+    except MissingInput as e:
+        state["result"] = {"error": str(e)}
+    except Exception as e:
+        state["result"] = node_failed(state, "update", e)
+    return state
 
+async def apatch_item(state: CrudState):
+    """Partial document update (by id or query) in one round trip"""
+    try:
+        filter_, update = patch_update(state)
+        upsert = bool(state.get("upsert"))
+        if state.get("return_document"):
+            # find_one_and_update is not coalesced: it has to answer with the document
+            doc = await get_async_db()[state["schema"]].find_one_and_update(
+                filter_, update, upsert=upsert, return_document=ReturnDocument.AFTER
+            )
+            state["result"] = patched_document_result(state, filter_, update, doc)
+        else:
+            result = await awrite_collection(state["schema"]).update_one(filter_, update, upsert=upsert)
+            state["result"] = patch_result(state, filter_, update, result)
+    except MissingInput as e:
+        state["result"] = {"error": str(e)}
     except Exception as e:
-        state["result"] = {
-            "success": False,
-            "error": f"Delete failed: {str(e)}",
-            "action": "delete",
-            "schema": state["schema"]
-        }
+        state["result"] = patch_failed(state, e)
+    return state
+
+async def adelete_item(state: CrudState):
+    """Delete item by ID or query"""
+    try:
+        filter_ = target_filter(state, "No item ID or query provided for delete operation")
+        result = await awrite_collection(state["schema"]).delete_one(filter_)
+        state["result"] = delete_result(state, filter_, result)
+    except MissingInput as e:
+        state["result"] = {"error": str(e)}
+    except Exception as e:
+        state["result"] = node_failed(state, "delete", e)
+    return state
 
+async def awrite_many(state: CrudState):
+    """Async write_many; set-based writes skip the write coalescer, they are one command already"""
+    try:
+        filter_, update = many_write(state)
+        collection = get_async_db()[state["schema"]]
+        if state.get("preview"):
+            state["result"] = many_result(state, filter_, count=await collection.count_documents(filter_))
+        elif update is None:
+            state["result"] = many_result(state, filter_, await collection.delete_many(filter_))
+        else:
+            state["result"] = many_result(state, filter_, await collection.update_many(filter_, update))
+    except Exception as e:
+        state["result"] = node_failed(state, state["action"], e)
     return state
 
 
 # Build the LangGraph router
-def genai_router():
-    """Build and compile the LangGraph router"""
+SYNC_NODES = {
+    "decide_crud": decide_crud_action,
+    "insert": insert_item,
+    "get_one": get_one_item,
+    "get_all": get_all_items,
+    "update": update_item,
+    "patch": patch_item,
+    "delete": delete_item,
+    "update_many": write_many,
+    "patch_many": write_many,
+    "delete_many": write_many,
+}
+
+ASYNC_NODES = {
+    "decide_crud": adecide_crud_action,
+    "insert": ainsert_item,
+    "get_one": aget_one_item,
+    "get_all": aget_all_items,
+    "update": aupdate_item,
+    "patch": apatch_item,
+    "delete": adelete_item,
+    "update_many": awrite_many,
+    "patch_many": awrite_many,
+    "delete_many": awrite_many,
+}
+
+def genai_router(use_async: bool = False):
+    """Build and compile the LangGraph router.
+
+    With use_async=True every node is a coroutine (llm.ainvoke, AsyncMongoClient);
+    run that graph with ainvoke.
+    """
+    from langgraph.graph import StateGraph, START, END
+
     graph = StateGraph(CrudState)
-    
+
     # Add nodes
-    graph.add_node("decide_crud", decide_crud_action)
-    graph.add_node("insert", insert_item)
-    graph.add_node("get_one", get_one_item)
-    graph.add_node("get_all", get_all_items)
-    graph.add_node("update", update_item)
-    graph.add_node("patch", patch_item)
-    graph.add_node("delete", delete_item)
+    nodes = ASYNC_NODES if use_async else SYNC_NODES
+    for name, node in nodes.items():
+        graph.add_node(name, node)
+    crud_nodes = [name for name in nodes if name != "decide_crud"]
 
     # Connect start to decision node
     graph.add_edge(START, "decide_crud")
@@ -555,23 +1039,35 @@ def genai_router():
     graph.add_conditional_edges(
         "decide_crud",
         route_decision,
-        {
-            "insert": "insert",
-            "get_one": "get_one",
-            "get_all": "get_all",
-            "update": "update",
-            "patch": "patch",
-            "delete": "delete",
-        },
+        {**{name: name for name in crud_nodes}, "finish": END},
     )
 
     # All CRUD nodes connect to END
-    for node in ["insert", "get_one", "get_all", "update", "patch", "delete"]:
+    for node in crud_nodes:
         graph.add_edge(node, END)
 
     # Compile and return the graph
     return graph.compile()
 
+# Compiled graphs keyed by configuration (use_async), shared by the FastAPI
+# app and the process_* helpers so neither recompiles per call
+_graphs: Dict[bool, Any] = {}
+_graphs_lock = threading.Lock()
+
+def get_graph(use_async: bool = False):
+    graph = _graphs.get(use_async)
+    if graph is None:
+        with _graphs_lock:
+            graph = _graphs.get(use_async)
+            if graph is None:
+                graph = _graphs[use_async] = genai_router(use_async=use_async)
+    return graph
+
+
+def failed_result(error: Any) -> dict:
+    return {"success": False, "error": str(error) if isinstance(error, Exception) else error}
+
+
 # Example usage function
 def process_query(user_input: str) -> dict:
     """
@@ -583,18 +1079,59 @@ def process_query(user_input: str) -> dict:
     - "Delete contact with id 507f1f77bcf86cd799439012"
     - "Get all users with email containing @example.com"
     """
-    router = genai_router()
-    
-    initial_state = CrudState(
-        user_input=user_input,
-        action="",
-        schema="",
-        item_id=None,
-        item=None,
-        result=None,
-        query=None,
-        error=None
-    )
-    
-    final_state = router.invoke(initial_state)
-    return final_state["result"]
\ No newline at end of file
+    final_state = get_graph().invoke(new_crud_state(user_input))
+    return final_state["result"]
+
+
+async def aprocess_query(user_input: str) -> dict:
+    """process_query on the async graph, the same path /query takes"""
+    final_state = await get_graph(use_async=True).ainvoke(new_crud_state(user_input))
+    return final_state["result"]
+
+
+def process_queries(user_inputs: List[str], batch_size: int = PLAN_BATCH_SIZE) -> List[dict]:
+    """Plan all inputs with as few LLM calls as possible, then run each through the graph"""
+    graph = get_graph()
+    results = []
+    for state in plan_queries([new_crud_state(text) for text in user_inputs], batch_size):
+        # Plans are already on the states, so decide_crud passes straight through
+        try:
+            results.append(graph.invoke(state)["result"] or failed_result("Invalid query result"))
+        except Exception as e:
+            results.append(failed_result(e))
+    return results
+
+
+async def arun_queries(user_inputs: List[str], batch_size: int = PLAN_BATCH_SIZE) -> List[Any]:
+    """Batch-plan, then run the async graph concurrently; one final state (or exception) per input"""
+    states = await aplan_queries([new_crud_state(text) for text in user_inputs], batch_size)
+    graph = get_graph(use_async=True)
+    return await asyncio.gather(*(graph.ainvoke(state) for state in states), return_exceptions=True)
+
+
+async def aprocess_queries(user_inputs: List[str], batch_size: int = PLAN_BATCH_SIZE) -> List[dict]:
+    results = []
+    for final_state in await arun_queries(user_inputs, batch_size):
+        if isinstance(final_state, Exception):
+            results.append(failed_result(final_state))
+        else:
+            results.append(final_state.get("result") or failed_result("Invalid query result"))
+    return results
+
+
+# Module-level names that are now built on first use
+_LAZY_ATTRS = {
+    "client": get_client,
+    "db": get_db,
+    "async_client": get_async_client,
+    "adb": get_async_db,
+    "write_coalescer": get_write_coalescer,
+    "llm": get_llm,
+    "SCHEMA_MAP": get_schema_map,
+    "rule_planner": get_rule_planner,
+}
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRS:
+        return _LAZY_ATTRS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,445 @@
+import asyncio
+import glob
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import xxhash
+from pymongo.errors import CollectionInvalid
+
+from .config import (
+    HISTORY_BACKEND, HISTORY_PATH, HISTORY_MAX_BYTES, HISTORY_COMPRESS,
+    HISTORY_COLLECTION, HISTORY_CAPPED_BYTES, HISTORY_BATCH_SIZE, HISTORY_QUEUE_SIZE,
+    HISTORY_PAYLOAD,
+)
+
+# How much of each /query result is kept in the history log
+PAYLOAD_LEVELS = ("full", "digest", "ids")
+
+# Fields every history entry keeps, whatever the payload level
+ENVELOPE_FIELDS = ("timestamp", "query", "success", "error", "action", "schema")
+
+
+def affected_ids(result: Dict[str, Any]) -> List[Any]:
+    """_ids inserted, upserted or returned by a CRUD result"""
+    if result.get("inserted_id"):
+        return [result["inserted_id"]]
+    if result.get("inserted_ids"):
+        return list(result["inserted_ids"])
+    if result.get("upserted_id"):
+        return [result["upserted_id"]]
+    data = result.get("data")
+    if isinstance(data, dict):
+        return [data["_id"]] if "_id" in data else []
+    if isinstance(data, list):
+        return [doc["_id"] for doc in data if isinstance(doc, dict) and "_id" in doc]
+    return []
+
+
+def payload_hash(result: Dict[str, Any]) -> str:
+    payload = json.dumps(result, sort_keys=True, separators=(",", ":"), default=str)
+    return xxhash.xxh3_64_hexdigest(payload.encode("utf-8"))
+
+
+def build_history_entry(result: Dict[str, Any], level: str = "digest",
+                        filter_: Optional[Dict[str, Any]] = None,
+                        max_ids: int = 100) -> Dict[str, Any]:
+    """Shrink a /query result to the configured history payload level.
+
+    full   - the result as returned to the client
+    digest - envelope + filter, count, affected _ids and a hash of the payload
+    ids    - envelope + affected _ids
+    """
+    if level == "full":
+        return result
+    if level not in PAYLOAD_LEVELS:
+        raise ValueError(f"Unknown history payload level: {level}")
+
+    entry = {key: result[key] for key in ENVELOPE_FIELDS if key in result}
+    ids = affected_ids(result)
+    entry["ids"] = ids[:max_ids]
+    if len(ids) > max_ids:
+        entry["ids_truncated"] = True
+
+    if level == "digest":
+        entry["filter"] = result.get("filter_used", filter_)
+        count = result.get("count")
+        for key in ("deleted_count", "modified_count", "matched_count"):
+            if count is None:
+                count = result.get(key)
+        if count is None and ids:
+            count = len(ids)
+        entry["count"] = count
+        entry["payload_hash"] = payload_hash(result)
+    return entry
+
+
+INDEX_SUFFIX = ".idx"
+
+
+def _ts_key(ts: Optional[str]) -> str:
+    """Comparable form of an entry timestamp ("...T11:52:04Z" sorts before "...T11:52:04.5Z")"""
+    if not ts:
+        return ""
+    ts = ts.rstrip("Z")
+    return ts if "." in ts else ts + ".000000"
+
+
+def _index_row(offset: int, length: int, entry: Dict[str, Any]) -> list:
+    return [offset, length, entry.get("timestamp"), entry.get("action"), entry.get("schema"), entry.get("success")]
+
+
+def _row_matches(row: list, action=None, schema=None, success=None, since=None, until=None) -> bool:
+    _, _, ts, row_action, row_schema, row_success = row
+    if action is not None and row_action != action:
+        return False
+    if schema is not None and row_schema != schema:
+        return False
+    if success is not None and bool(row_success) != success:
+        return False
+    if since is not None and _ts_key(ts) < since:
+        return False
+    if until is not None and _ts_key(ts) > until:
+        return False
+    return True
+
+
+class JsonlHistoryBackend:
+    """Append-only JSON Lines log with size-based rotation.
+
+    Rotated segments are renamed to <stem>.<utc timestamp>.jsonl and, if
+    compress is set, rewritten as zstd (.jsonl.zst). Every segment has a
+    sidecar <segment>.idx with one [offset, length, timestamp, action,
+    schema, success] row per entry, so queries scan the small index and
+    only seek to the entries they return.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, compress: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self._file = None
+        self._index = None
+
+    def _open(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(self.path) and not os.path.exists(self.path + INDEX_SUFFIX):
+                self._build_index(self.path)
+            self._file = open(self.path, "ab")
+            self._index = open(self.path + INDEX_SUFFIX, "ab")
+        return self._file
+
+    def _segment_path(self) -> str:
+        stem, ext = os.path.splitext(self.path)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        return f"{stem}.{stamp}{ext}"
+
+    def rotate(self) -> Optional[str]:
+        """Close the active file and move it aside as a finished segment"""
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = None
+            self._index = None
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return None
+
+        segment = self._segment_path()
+        os.replace(self.path, segment)
+        if os.path.exists(self.path + INDEX_SUFFIX):
+            os.replace(self.path + INDEX_SUFFIX, segment + INDEX_SUFFIX)
+        if self.compress:
+            import zstandard
+
+            with open(segment, "rb") as src, open(f"{segment}.zst", "wb") as dst:
+                zstandard.ZstdCompressor(level=3).copy_stream(src, dst)
+            os.remove(segment)
+            if os.path.exists(segment + INDEX_SUFFIX):
+                os.replace(segment + INDEX_SUFFIX, f"{segment}.zst{INDEX_SUFFIX}")
+            segment = f"{segment}.zst"
+        return segment
+
+    def write_batch(self, entries: List[Dict[str, Any]]) -> None:
+        lines = [
+            json.dumps(entry, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+            for entry in entries
+        ]
+        data = b"".join(lines)
+        f = self._open()
+        if self.max_bytes and f.tell() and f.tell() + len(data) > self.max_bytes:
+            self.rotate()
+            f = self._open()
+
+        offset = f.tell()
+        rows = []
+        for entry, line in zip(entries, lines):
+            rows.append(json.dumps(_index_row(offset, len(line), entry), separators=(",", ":")))
+            offset += len(line)
+        # Data before index: an index row never points past the end of the log
+        f.write(data)
+        f.flush()
+        self._index.write(("\n".join(rows) + "\n").encode("utf-8"))
+        self._index.flush()
+
+    async def write(self, entries: List[Dict[str, Any]]) -> None:
+        await asyncio.to_thread(self.write_batch, entries)
+
+    async def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = None
+            self._index = None
+
+    # -- reading ---------------------------------------------------------
+
+    @staticmethod
+    def _open_segment(segment: str):
+        if segment.endswith(".zst"):
+            import zstandard
+
+            return zstandard.ZstdDecompressor().stream_reader(open(segment, "rb"), closefd=True)
+        return open(segment, "rb")
+
+    def _build_index(self, segment: str) -> None:
+        """(Re)create the sidecar index of a segment written before indexing existed"""
+        offset = 0
+        with self._open_segment(segment) as f, open(segment + INDEX_SUFFIX, "w") as idx:
+            buffered = f if not segment.endswith(".zst") else io.BufferedReader(f)
+            for line in buffered:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = {}
+                idx.write(json.dumps(_index_row(offset, len(line), entry), separators=(",", ":")) + "\n")
+                offset += len(line)
+
+    def segments(self) -> List[str]:
+        """All segments, newest first"""
+        stem, ext = os.path.splitext(self.path)
+        rotated = glob.glob(f"{glob.escape(stem)}.*{ext}") + glob.glob(f"{glob.escape(stem)}.*{ext}.zst")
+        ordered = sorted(rotated, reverse=True)
+        if os.path.exists(self.path):
+            ordered.insert(0, self.path)
+        return ordered
+
+    def _read_index(self, segment: str) -> List[list]:
+        if not os.path.exists(segment + INDEX_SUFFIX):
+            self._build_index(segment)
+        rows = []
+        with open(segment + INDEX_SUFFIX, "rb") as idx:
+            for line in idx:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue  # torn trailing row from a concurrent append
+        return rows
+
+    @staticmethod
+    def _index_bounds(segment: str) -> Optional[tuple]:
+        """(first, last) timestamp keys of a segment, read from the ends of its index"""
+        idx_path = segment + INDEX_SUFFIX
+        try:
+            with open(idx_path, "rb") as idx:
+                first = idx.readline()
+                idx.seek(max(0, os.path.getsize(idx_path) - 4096))
+                tail = idx.read().rstrip(b"\n").rsplit(b"\n", 1)[-1]
+            return _ts_key(json.loads(first)[2]), _ts_key(json.loads(tail)[2])
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def _read_entries(self, segment: str, rows: List[list]) -> Dict[int, Dict[str, Any]]:
+        entries = {}
+        with self._open_segment(segment) as f:
+            for offset, length, *_ in sorted(rows):
+                f.seek(offset)  # forward-only for .zst, hence the sort
+                entries[offset] = json.loads(f.read(length))
+        return entries
+
+    def query_sync(self, action: Optional[str] = None, schema: Optional[str] = None,
+                   success: Optional[bool] = None, since: Optional[str] = None,
+                   until: Optional[str] = None, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        since_key = _ts_key(since) if since else None
+        until_key = _ts_key(until) if until else None
+        wanted = offset + limit + 1  # one extra to know whether there is a next page
+        matches = []
+        for segment in self.segments():
+            if segment != self.path and (since_key or until_key):
+                bounds = self._index_bounds(segment)
+                if bounds and ((since_key and bounds[1] < since_key) or (until_key and bounds[0] > until_key)):
+                    continue
+            rows = [
+                row for row in reversed(self._read_index(segment))
+                if _row_matches(row, action, schema, success, since_key, until_key)
+            ]
+            matches.extend((segment, row) for row in rows[:wanted - len(matches)])
+            if len(matches) >= wanted:
+                break
+
+        page = matches[offset:offset + limit]
+        by_segment: Dict[str, List[list]] = {}
+        for segment, row in page:
+            by_segment.setdefault(segment, []).append(row)
+        loaded = {segment: self._read_entries(segment, rows) for segment, rows in by_segment.items()}
+        return {
+            "entries": [loaded[segment][row[0]] for segment, row in page],
+            "next_offset": offset + limit if len(matches) > offset + limit else None,
+        }
+
+    async def query(self, **filters) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.query_sync, **filters)
+
+
+class MongoHistoryBackend:
+    """History in a capped collection, written with batched insert_many"""
+
+    def __init__(self, database, collection: str = "crud_history", capped_bytes: int = 256 * 1024 * 1024):
+        self.database = database
+        self.collection_name = collection
+        self.capped_bytes = capped_bytes
+        self.collection = database[collection]
+
+    async def setup(self) -> None:
+        try:
+            await self.database.create_collection(
+                self.collection_name, capped=True, size=self.capped_bytes
+            )
+        except CollectionInvalid:
+            pass  # already exists
+        # Secondary indexes backing the /history filters, newest first
+        await self.collection.create_index([("timestamp", -1)])
+        await self.collection.create_index([("action", 1), ("schema", 1), ("timestamp", -1)])
+        await self.collection.create_index([("schema", 1), ("timestamp", -1)])
+        await self.collection.create_index([("success", 1), ("timestamp", -1)])
+
+    async def write(self, entries: List[Dict[str, Any]]) -> None:
+        # insert_many adds _id to each dict; keep the caller's entries untouched
+        await self.collection.insert_many([dict(entry) for entry in entries], ordered=False)
+
+    async def query(self, action: Optional[str] = None, schema: Optional[str] = None,
+                    success: Optional[bool] = None, since: Optional[str] = None,
+                    until: Optional[str] = None, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        filter_: Dict[str, Any] = {}
+        if action is not None:
+            filter_["action"] = action
+        if schema is not None:
+            filter_["schema"] = schema
+        if success is not None:
+            filter_["success"] = success
+        if since or until:
+            filter_["timestamp"] = {}
+            if since:
+                filter_["timestamp"]["$gte"] = since
+            if until:
+                filter_["timestamp"]["$lte"] = until
+
+        cursor = (
+            self.collection.find(filter_, {"_id": 0})
+            .sort("timestamp", -1)
+            .skip(offset)
+            .limit(limit + 1)
+        )
+        entries = await cursor.to_list()
+        return {
+            "entries": entries[:limit],
+            "next_offset": offset + limit if len(entries) > limit else None,
+        }
+
+    async def close(self) -> None:
+        pass
+
+
+_STOP = object()
+
+
+class HistorySink:
+    """Non-blocking history recorder.
+
+    record() only enqueues; a single background task drains the queue in
+    batches and hands them to the backend, so requests never wait on disk
+    and concurrent requests cannot clobber each other's entries.
+    """
+
+    def __init__(self, backend, batch_size: int = 256, queue_size: int = 10000):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        if hasattr(self.backend, "setup"):
+            await self.backend.setup()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        if self._queue is None:
+            raise RuntimeError("History sink is not started")
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            # Shed load rather than stall the request path
+            self.dropped += 1
+
+    def _drain(self, batch: List[Dict[str, Any]]) -> bool:
+        """Top up batch from the queue; returns False once the stop marker is seen"""
+        while len(batch) < self.batch_size:
+            try:
+                entry = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if entry is _STOP:
+                return False
+            batch.append(entry)
+        return True
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        try:
+            await self.backend.write(batch)
+        except Exception as e:
+            print(f"Failed to save {len(batch)} history entries: {e}")
+
+    async def _run(self) -> None:
+        running = True
+        while running:
+            entry = await self._queue.get()
+            if entry is _STOP:
+                break
+            batch = [entry]
+            running = self._drain(batch)
+            await self._write(batch)
+
+    async def stop(self) -> None:
+        """Flush everything recorded so far, then stop the writer task"""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        await self.backend.close()
+
+
+def create_history_sink(database=None) -> HistorySink:
+    """Build the sink configured by HISTORY_BACKEND ("jsonl" or "mongo")"""
+    if HISTORY_PAYLOAD not in PAYLOAD_LEVELS:
+        raise ValueError(f"Unknown HISTORY_PAYLOAD: {HISTORY_PAYLOAD}")
+    if HISTORY_BACKEND == "mongo":
+        if database is None:
+            raise ValueError("The mongo history backend needs a database")
+        backend = MongoHistoryBackend(database, HISTORY_COLLECTION, HISTORY_CAPPED_BYTES)
+    elif HISTORY_BACKEND == "jsonl":
+        backend = JsonlHistoryBackend(HISTORY_PATH, HISTORY_MAX_BYTES, HISTORY_COMPRESS)
+    else:
+        raise ValueError(f"Unknown HISTORY_BACKEND: {HISTORY_BACKEND}")
+    return HistorySink(backend, batch_size=HISTORY_BATCH_SIZE, queue_size=HISTORY_QUEUE_SIZE)
@@ -1,15 +1,80 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+import asyncio
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from .genai_router import genai_router, CrudState
-from .serializers import serialize_mongodb_doc
-from pymongo import MongoClient
-from fastapi.responses import JSONResponse
-from datetime import datetime
-from .serializers import serialize_mongodb_doc as serialize_doc
-import json
+from .genai_router import (
+    get_graph, CrudState, plan_cache, plan_templates, load_plan_caches, aread_collection,
+    arun_queries, plan_batcher, get_schema_map,
+)
+from .history import HistorySink, create_history_sink, build_history_entry
+from .warmup import warmup
+from . import db
+from .config import (
+    HISTORY_PAYLOAD, HISTORY_MAX_IDS, QUERY_BATCH_MAX, WARMUP,
+    CONTACTS_PAGE_SIZE, CONTACTS_MAX_PAGE_SIZE, STREAM_BATCH_SIZE,
+)
+from .utils import encode_cursor, decode_cursor, parse_projection
+from .responses import (
+    wants_ndjson, aiter_ndjson, ndjson_response, negotiated_response,
+)
+from .raw_bson import is_raw, document_id
+from .serializers import serialize_mongodb_doc, MongoJSONResponse
+from datetime import datetime, timezone
+
+# Append-only /query history, written by a background task started in lifespan
+history_sink: Optional[HistorySink] = None
+
+
+def record_history(entry: dict) -> None:
+    if history_sink is not None:
+        history_sink.record(entry)
+
+
+# Startup warmup result; None until it has finished, which is what GET /ready reports
+warmup_report: Optional[dict] = None
+
+
+async def run_warmup() -> None:
+    global warmup_report
+    try:
+        warmup_report = await warmup(compile_graph=get_agent)
+    except Exception as e:
+        warmup_report = {"ok": False, "error": str(e)}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global history_sink, warmup_report
+    # One MongoDB pool per worker, shared by every route and graph node
+    await db.connect()
+    history_sink = create_history_sink(db.get_async_db())
+    await history_sink.start()
+    warmup_task = None
+    if WARMUP:
+        # Runs in the background so the process is live (not ready) while it primes
+        warmup_task = asyncio.create_task(run_warmup())
+    else:
+        # Warm start: persisted plans and the compiled graph are ready before the first request
+        load_plan_caches()
+        get_agent()
+        warmup_report = {"ok": True, "skipped": True}
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    # Flush queued history entries before the clients go away
+    await history_sink.stop()
+    # Persist the plan caches so a restarted worker starts warm
+    for cache in (plan_cache, plan_templates):
+        try:
+            cache.save()
+        except Exception as e:
+            print(f"Failed to save plan cache: {e}")
+    await db.close()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan, default_response_class=MongoJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -21,49 +86,48 @@ app.add_middleware(
 )
 
 
-agent = genai_router()  # Build the agent
+def get_agent():
+    """The agent: the shared compiled graph with async nodes, awaited via ainvoke"""
+    return get_graph(use_async=True)
 
 class QueryRequest(BaseModel):
     query: str
 
 
-# MongoDB connection
-client = MongoClient("mongodb://localhost:27017/")
-db = client["development"]   # replace with your db name
-contacts_collection = db["contacts"]
-
-def save_response_to_file(response: dict, filename="crud_history.json"):
-    """
-    Append a CRUD response to a JSON file for tracking history.
-    """
-    try:
-        # Load existing history if file exists
-        try:
-            with open(filename, "r") as f:
-                history = json.load(f)
-        except FileNotFoundError:
-            history = []
-
-        # Add timestamp to response
-        response["timestamp"] = datetime.utcnow().isoformat() + "Z"
-
-        # Append the new response
-        history.append(response)
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
 
-        # Save back to file
-        with open(filename, "w") as f:
-            json.dump(history, f, indent=4)
 
-        print(f"Response saved to {filename}")
+@app.get("/contacts")
+async def get_contacts(
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = None,
+    stream: bool = False,
+    accept: Optional[str] = Header(None),
+):
+    """Keyset-paginated contacts: pass the previous page's `next` as `after`.
 
-    except Exception as e:
-        print(f"Failed to save response: {e}")
+    With ?stream=true or Accept: application/x-ndjson every contact after the
+    cursor (up to limit, if given) is streamed as one JSON document per line.
+    Accept: application/msgpack returns the page as MessagePack.
+    """
+    try:
+        filter_ = {"_id": {"$gt": decode_cursor(after)}} if after else {}
+        projection = parse_projection(fields, get_schema_map()["contacts"].model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    if wants_ndjson(accept, stream):
+        # Memory stays flat, so the page-size cap does not apply
+        cursor = aread_collection("contacts").find(filter_, projection).sort("_id", 1).limit(limit or 0)
+        return ndjson_response(aiter_ndjson(cursor.batch_size(STREAM_BATCH_SIZE)))
 
-@app.get("/contacts")
-def get_contacts():
-    contacts = list(contacts_collection.find())
-    data = [serialize_doc(c) for c in contacts]
+    limit = min(limit or CONTACTS_PAGE_SIZE, CONTACTS_MAX_PAGE_SIZE)
+    # One extra document tells us whether there is a next page
+    contacts = await aread_collection("contacts").find(filter_, projection).sort("_id", 1).limit(limit + 1).to_list()
+    has_more = len(contacts) > limit
+    data = contacts[:limit]
 
     response = {
         "result": {
@@ -72,10 +136,71 @@ def get_contacts():
             "count": len(data),
             "action": "get_all",
             "schema": "contacts",
-            "query": None
+            "query": None,
+            "next": encode_cursor(document_id(data[-1])) if has_more else None,
         }
     }
-    return JSONResponse(content=response)
+    # Raw documents go straight to JSON (or msgpack) bytes; no jsonable_encoder pass
+    return negotiated_response(response, accept)
+
+def _history_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Render a filter bound in the same UTC format /query history entries use"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+@app.get("/history")
+async def get_history(
+    action: Optional[str] = None,
+    schema: Optional[str] = None,
+    success: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    accept: Optional[str] = Header(None),
+):
+    """Page through /query history, newest first"""
+    if history_sink is None:
+        raise HTTPException(status_code=503, detail="History is not available")
+    page = await history_sink.backend.query(
+        action=action,
+        schema=schema,
+        success=success,
+        since=_history_timestamp(since),
+        until=_history_timestamp(until),
+        offset=offset,
+        limit=limit,
+    )
+    return negotiated_response({
+        "entries": page["entries"],
+        "count": len(page["entries"]),
+        "offset": offset,
+        "next_offset": page["next_offset"],
+    }, accept)
+
+
+@app.get("/ready")
+def readiness():
+    """503 until startup (including the optional warmup) has finished, and if any warmup step failed"""
+    if warmup_report is None:
+        return MongoJSONResponse({"ready": False, "status": "warming up"}, status_code=503)
+    if not warmup_report.get("ok"):
+        # e.g. the mongo_pool step could not reach the server
+        return MongoJSONResponse({"ready": False, "status": "warmup failed", "warmup": warmup_report}, status_code=503)
+    return {"ready": True, "warmup": warmup_report}
+
+
+@app.get("/plan-cache")
+def get_plan_cache_stats():
+    return {
+        "exact": plan_cache.stats(),
+        "templates": plan_templates.stats(),
+        "microbatch": plan_batcher.stats() if plan_batcher else None,
+    }
 
 # @app.post("/query")
 # async def query(req: QueryRequest):
@@ -105,8 +230,82 @@ def get_contacts():
 #         raise HTTPException(status_code=500, detail=str(e))
 
 
+def finish_query(user_query: str, result_state: dict) -> dict:
+    """Serialize a finished graph state, stamp it and queue it for history"""
+    result = result_state.get("result")
+    raw_docs = result.get("data") if isinstance(result, dict) and is_raw(result.get("data")) else None
+
+    # Serialize the MongoDB result; raw BSON documents are left for the response to write
+    serialized_result = dict(result) if raw_docs is not None else serialize_mongodb_doc(result)
+
+    # Add the query as a new key
+    serialized_result["query"] = user_query
+    serialized_result["timestamp"] = datetime.utcnow().isoformat() + "Z"
+
+    # History only needs the _ids of a pass-through read
+    history_result = serialized_result
+    if raw_docs is not None:
+        docs = raw_docs if isinstance(raw_docs, list) else [raw_docs]
+        history_result = serialize_mongodb_doc(
+            {**serialized_result, "data": [{"_id": document_id(doc)} for doc in docs]}
+        )
+
+    # Queue for history tracking, trimmed to the configured payload level
+    plan_filter = result_state.get("query")
+    record_history(build_history_entry(
+        history_result,
+        HISTORY_PAYLOAD,
+        filter_=serialize_mongodb_doc(plan_filter) if isinstance(plan_filter, dict) else None,
+        max_ids=HISTORY_MAX_IDS,
+    ))
+    return serialized_result
+
+
+def stream_query_result(user_query: str, result_state: dict):
+    """NDJSON response for a streamed get_all; history is recorded once the stream ends"""
+    result = result_state["result"]
+    ids = []
+    count = 0
+
+    def collect(doc):
+        nonlocal count
+        count += 1
+        if len(ids) <= HISTORY_MAX_IDS:
+            ids.append(document_id(doc))
+
+    async def chunks():
+        try:
+            async for chunk in aiter_ndjson(result["cursor"], on_document=collect):
+                yield chunk
+        finally:
+            summary = {key: value for key, value in result.items() if key != "cursor"}
+            summary.update(count=count, query=user_query, streamed=True)
+            summary["data"] = [{"_id": _id} for _id in ids]
+            summary["timestamp"] = datetime.utcnow().isoformat() + "Z"
+            record_history(build_history_entry(
+                serialize_mongodb_doc(summary),
+                HISTORY_PAYLOAD,
+                filter_=serialize_mongodb_doc(result.get("query")),
+                max_ids=HISTORY_MAX_IDS,
+            ))
+
+    return ndjson_response(chunks(), headers={
+        "X-Crud-Action": result["action"],
+        "X-Crud-Schema": result["schema"],
+    })
+
+
 @app.post("/query")
-async def query(req: QueryRequest):
+async def query(
+    req: QueryRequest,
+    stream: bool = False,
+    return_document: bool = False,
+    preview: bool = False,
+    accept: Optional[str] = Header(None),
+):
+    """Run one natural-language query. ?return_document=true makes a patch
+    return the updated document from the same round trip; ?preview=true makes
+    update_many/patch_many/delete_many only count the documents they would touch."""
     try:
         # Initialize state as a dictionary
         state: CrudState = {
@@ -115,33 +314,48 @@ async def query(req: QueryRequest):
             "action": "",
             "schema": "",
             "item_id": "",
+            "item_ids": None,
             "item": None,
             "result": None,
             "error": None,
+            # get_all results can be streamed as NDJSON instead of one JSON body
+            "stream": wants_ndjson(accept, stream),
+            "upsert": False,
+            "return_document": return_document,
+            "preview": preview,
         }
         
         # Run the LangGraph agent asynchronously
-        result_state = await agent.ainvoke(state)
+        result_state = await get_agent().ainvoke(state)
         if not result_state or "result" not in result_state:
             raise HTTPException(status_code=400, detail="Invalid query result")
-        
-        # Serialize the MongoDB result
-        serialized_result = serialize_mongodb_doc(result_state.get("result"))
-
-        # Add the query as a new key
-        serialized_result["query"] = req.query
-        serialized_result["timestamp"] = datetime.utcnow().isoformat() + "Z"
-
-        # # ✅ Return full response with query info
-        # return {
-        #     "result": {
-        #         "data": serialized_result,
-        #         "query": req.query
-        #     }
-        # }
-        save_response_to_file(serialized_result)  # Save to file for history tracking
-        return serialized_result
+
+        if result_state["result"] and "cursor" in result_state["result"]:
+            return stream_query_result(req.query, result_state)
+        return negotiated_response(finish_query(req.query, result_state), accept)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-        
+
+
+@app.post("/query/batch")
+async def query_batch(req: BatchQueryRequest, accept: Optional[str] = Header(None)):
+    """Plan all queries with as few LLM calls as possible, then run each through the graph"""
+    if len(req.queries) > QUERY_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {QUERY_BATCH_MAX} queries per batch")
+
+    try:
+        # Plans are already on the states, so decide_crud passes straight through
+        result_states = await arun_queries(req.queries)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    results = []
+    for text, result_state in zip(req.queries, result_states):
+        if isinstance(result_state, Exception) or not result_state or not result_state.get("result"):
+            error = str(result_state) if isinstance(result_state, Exception) else "Invalid query result"
+            results.append({"success": False, "error": error, "query": text})
+            continue
+        results.append(finish_query(text, result_state))
+
+    return negotiated_response({"results": results, "count": len(results)}, accept)
@@ -0,0 +1,124 @@
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import xxhash
+
+
+def normalize_input(text: str) -> str:
+    """Collapse whitespace so trivially different prompts share a cache key"""
+    return " ".join((text or "").split())
+
+
+class PlanCache:
+    """LRU + TTL cache of parsed planner output keyed by normalized user input"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl  # seconds, 0 disables expiry
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return xxhash.xxh3_64_hexdigest(normalize_input(text).encode("utf-8"))
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - stored_at > self.ttl
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached plan, or None on miss/expiry"""
+        key = self.make_key(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[0], now):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Callers mutate the plan via state.update, never hand out the stored dict
+            return copy.deepcopy(entry[1])
+
+    def put(self, text: str, plan: Dict[str, Any]) -> None:
+        if self.maxsize <= 0:
+            return
+        key = self.make_key(text)
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(plan))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Persist live entries to disk (atomic replace)"""
+        path = path or self.path
+        if not path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [
+                [key, stored_at, plan]
+                for key, (stored_at, plan) in self._entries.items()
+                if not self._expired(stored_at, now)
+            ]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "entries": entries}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: Optional[str] = None) -> int:
+        """Load persisted entries, skipping expired ones. Returns entries loaded."""
+        path = path or self.path
+        if not path:
+            return 0
+        try:
+            with open(path, "r") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"Failed to load plan cache from {path}: {e}")
+            return 0
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, stored_at, plan in payload.get("entries", []):
+                if self._expired(stored_at, now):
+                    continue
+                self._entries[key] = (stored_at, plan)
+                self._entries.move_to_end(key)
+                loaded += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return loaded
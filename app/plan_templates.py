@@ -0,0 +1,159 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .plan_cache import PlanCache, normalize_input
+
+# Literals that vary between otherwise identical queries. Order matters:
+# an ObjectId must win over the number alternative, quotes over emails.
+SLOT_PATTERN = re.compile(
+    r"""(?P<quoted>"[^"\n]*"|'[^'\n]*')"""
+    r"|(?P<oid>\b[a-fA-F0-9]{24}\b)"
+    r"|(?P<email>\b[\w.%+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}\b)"
+    r"|(?P<num>(?<![\w.])-?\d+(?:\.\d+)?(?![\w.]))"
+)
+
+# Slots whose literal may be embedded inside a longer string (e.g. a regex);
+# very short literals are too likely to match by accident
+SUBSTRING_SLOTS = {"quoted", "oid", "email"}
+MIN_SUBSTRING_LEN = 3
+
+Slot = Tuple[str, str]  # (kind, literal)
+
+# Plan keys whose numbers can come from the query ("top 5", "age 30"); elsewhere
+# a number is structure, e.g. projection {"name": 1} or sort [["createdAt", 1]]
+NUMBER_KEYS = {"limit", "skip", "item", "query"}
+# Plan keys kept literal: what to run and where, field names and directions, never user values
+LITERAL_KEYS = {"action", "schema", "projection", "sort", "hint"}
+
+
+def mask_input(user_input: str) -> Tuple[str, List[Slot]]:
+    """Replace variable literals with numbered slots.
+
+    "delete contact id 68b97d47..." -> ("delete contact id <oid0>", [("oid", "68b97d47...")])
+    """
+    slots: List[Slot] = []
+
+    def _replace(match: "re.Match") -> str:
+        kind = match.lastgroup
+        literal = match.group(kind)
+        if kind == "quoted":
+            literal = literal[1:-1]
+        slots.append((kind, literal))
+        return f"<{kind}{len(slots) - 1}>"
+
+    shape = SLOT_PATTERN.sub(_replace, normalize_input(user_input))
+    return shape, slots
+
+
+def _number(literal: str):
+    return float(literal) if "." in literal else int(literal)
+
+
+def _templatize(value: Any, slots: List[Slot], used: set, numbers: bool = True) -> Any:
+    if isinstance(value, dict):
+        return {k: _templatize(v, slots, used, numbers) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_templatize(v, slots, used, numbers) for v in value]
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        if not numbers:
+            return value
+        for index, (kind, literal) in enumerate(slots):
+            if kind == "num" and _number(literal) == value:
+                used.add(index)
+                return {"$slot": index, "type": type(value).__name__}
+        return value
+    if isinstance(value, str):
+        for index, (kind, literal) in enumerate(slots):
+            if value == literal:
+                used.add(index)
+                return {"$slot": index}
+        # Longest literal first so an email is not split by a shorter slot
+        text = value
+        for index, (kind, literal) in sorted(enumerate(slots), key=lambda s: -len(s[1][1])):
+            if kind not in SUBSTRING_SLOTS or len(literal) < MIN_SUBSTRING_LEN:
+                continue
+            marker = f"\x00{index}\x00"
+            segments = re.split(r"(\x00\d+\x00)", text)
+            replaced = "".join(
+                seg if seg.startswith("\x00") else seg.replace(literal, marker) for seg in segments
+            )
+            if replaced != text:
+                used.add(index)
+                text = replaced
+        if text != value:
+            return {"$template": text}
+    return value
+
+
+def learn_template(slots: List[Slot], plan: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Derive a reusable plan template, or None if the plan is not a pure function of the slots"""
+    if not slots:
+        return None
+    literals = [literal for _, literal in slots]
+    if len(set(literals)) != len(literals):
+        return None  # ambiguous: cannot tell which occurrence the plan used
+
+    used: set = set()
+    template = {
+        key: value if key in LITERAL_KEYS else _templatize(value, slots, used, numbers=key in NUMBER_KEYS)
+        for key, value in plan.items()
+    }
+    if len(used) != len(slots):
+        return None
+    return template
+
+
+def _fill(value: Any, slots: List[Slot]) -> Any:
+    if isinstance(value, dict):
+        if "$slot" in value:
+            kind, literal = slots[value["$slot"]]
+            if value.get("type") in ("int", "float"):
+                # "3.75" filled into a template learned from "3" stays 3.75
+                return _number(literal)
+            return literal
+        if "$template" in value:
+            return re.sub(r"\x00(\d+)\x00", lambda m: slots[int(m.group(1))][1], value["$template"])
+        return {k: _fill(v, slots) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, slots) for v in value]
+    return value
+
+
+def fill_template(template: Dict[str, Any], slots: List[Slot]) -> Dict[str, Any]:
+    return _fill(template, slots)
+
+
+class PlanTemplates:
+    """Learned table of plan templates keyed by the masked query shape"""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 0, path: Optional[str] = None):
+        self.table = PlanCache(maxsize=maxsize, ttl=ttl, path=path)
+
+    def lookup(self, user_input: str) -> Optional[Dict[str, Any]]:
+        shape, slots = mask_input(user_input)
+        if not slots:
+            return None
+        template = self.table.get(shape)
+        if template is None:
+            return None
+        return fill_template(template, slots)
+
+    def learn(self, user_input: str, plan: Dict[str, Any]) -> bool:
+        """Record a successful LLM plan as a template for its query shape"""
+        shape, slots = mask_input(user_input)
+        template = learn_template(slots, plan)
+        if template is None:
+            return False
+        self.table.put(shape, template)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return self.table.stats()
+
+    def load(self) -> int:
+        return self.table.load()
+
+    def save(self) -> None:
+        self.table.save()
@@ -0,0 +1,60 @@
+from typing import Any
+
+import bson
+import orjson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+# Optional C transcoder from BSON to relaxed Extended JSON (pip install python-bsonjs)
+try:
+    import bsonjs
+except ImportError:
+    bsonjs = None
+
+RAW_READ_MODES = ("off", "on", "extjson")
+
+# Element type 0x07 (ObjectId) named "_id" right after the int32 size: how mongod stores _id
+_OID_ID_PREFIX = b"\x07_id\x00"
+
+
+class ExtendedJSONDocument(RawBSONDocument):
+    """Raw document relayed to clients as relaxed Extended JSON by bsonjs"""
+
+
+def raw_codec_options(extended_json: bool = False) -> CodecOptions:
+    """Reads with these options keep each document as its undecoded BSON bytes"""
+    return CodecOptions(document_class=ExtendedJSONDocument if extended_json else RawBSONDocument)
+
+
+def raw_collection(collection, extended_json: bool = False):
+    return collection.with_options(codec_options=raw_codec_options(extended_json))
+
+
+def is_raw(data: Any) -> bool:
+    """True for a RawBSONDocument or a list of them (a pass-through read result)"""
+    if isinstance(data, list):
+        return bool(data) and isinstance(data[0], RawBSONDocument)
+    return isinstance(data, RawBSONDocument)
+
+
+def document_id(doc: Any) -> Any:
+    """_id of a document, read straight from the bytes when it is a leading raw ObjectId"""
+    if isinstance(doc, RawBSONDocument):
+        raw = doc.raw
+        if raw[4:9] == _OID_ID_PREFIX:
+            return ObjectId(raw[9:21])
+    return doc.get("_id")
+
+
+def raw_to_jsonable(doc: RawBSONDocument) -> Any:
+    """Value orjson can write for a raw document.
+
+    ExtendedJSONDocument is transcoded from BSON to JSON bytes by bsonjs without
+    building Python objects (ObjectId and dates become {"$oid"} and {"$date"}).
+    Otherwise it is decoded once, in pymongo's C extension, into the dict orjson
+    encodes, so the JSON matches the regular read path.
+    """
+    if bsonjs is not None and isinstance(doc, ExtendedJSONDocument):
+        return orjson.Fragment(bsonjs.dumps(doc.raw))
+    return bson.decode(doc.raw)
@@ -0,0 +1,68 @@
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, Optional
+
+from fastapi.responses import Response, StreamingResponse
+
+from .serializers import dumps, MongoJSONResponse, MongoMsgPackResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_ACCEPT = (NDJSON_MEDIA_TYPE, "application/ndjson", "application/jsonl")
+MSGPACK_ACCEPT = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Lines are buffered up to this size before being written to the socket
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+OnDocument = Optional[Callable[[Any], None]]
+
+
+def wants_ndjson(accept: Optional[str], stream: bool = False) -> bool:
+    """Stream when asked via ?stream=true or an NDJSON media type in Accept"""
+    if stream:
+        return True
+    return bool(accept) and any(media in accept for media in NDJSON_ACCEPT)
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    return bool(accept) and any(media in accept for media in MSGPACK_ACCEPT)
+
+
+def negotiated_response(content: Any, accept: Optional[str], status_code: int = 200) -> Response:
+    """MessagePack body when the client accepts it, JSON otherwise"""
+    if wants_msgpack(accept):
+        return MongoMsgPackResponse(content, status_code=status_code)
+    return MongoJSONResponse(content, status_code=status_code)
+
+
+def ndjson_line(doc: Any) -> bytes:
+    return dumps(doc) + b"\n"
+
+
+def iter_ndjson(docs: Iterable[Any], on_document: OnDocument = None) -> Iterator[bytes]:
+    """Serialize documents one at a time from a (sync) cursor into NDJSON chunks"""
+    buffer = bytearray()
+    for doc in docs:
+        if on_document:
+            on_document(doc)
+        buffer += ndjson_line(doc)
+        if len(buffer) >= NDJSON_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def aiter_ndjson(docs: AsyncIterator[Any], on_document: OnDocument = None) -> AsyncIterator[bytes]:
+    """Async counterpart of iter_ndjson for AsyncMongoClient cursors"""
+    buffer = bytearray()
+    async for doc in docs:
+        if on_document:
+            on_document(doc)
+        buffer += ndjson_line(doc)
+        if len(buffer) >= NDJSON_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def ndjson_response(chunks, headers: Optional[dict] = None) -> StreamingResponse:
+    return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE, headers=headers)
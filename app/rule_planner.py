@@ -0,0 +1,353 @@
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+
+# One precompiled tokenizer; scan() walks the input once with finditer and
+# pulls ObjectIds, emails, key/value pairs, status and entity names from the tokens
+TOKEN_PATTERN = re.compile(r"""
+    (?P<quoted>"[^"\n]*"|'[^'\n]*')
+  | (?P<email>[\w.%+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,})
+  | (?P<oid>\b[a-fA-F0-9]{24}\b)
+  | (?P<word>\w+(?:[.'-]\w+)*)
+  | (?P<assign>[:=])
+  | (?P<sep>[,;\n])
+""", re.X)
+
+# Fields that take a value without a connector ("name John", "status is active")
+IMPLICIT_FIELDS = {"name", "email", "phone", "title", "description", "status"}
+# Filter-only keys, never written into an item ("called Bob", "id 68b9...")
+IMPLICIT_FILTERS = {"called", "mail", "id", "_id"}
+CONNECTORS = {"to", "as"}
+# Words that end a value: "name John and email ..." stops before "and"
+STOP_WORDS = {"and", "with", "where", "whose", "set"}
+ENTITY_WORDS = {"user", "contact", "customer", "employee"}
+NOT_ENTITY_NAMES = STOP_WORDS | CONNECTORS | IMPLICIT_FIELDS | IMPLICIT_FILTERS | {"is", "named", "all", "by"}
+FLOAT_PATTERN = re.compile(r"^\d+\.\d+$")
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+    end: int
+
+
+class Scan(NamedTuple):
+    """Everything the planner reads from one pass over the input"""
+    object_ids: List[str]
+    emails: List[str]
+    fields: Dict[str, Any]
+    filters: Dict[str, Any]
+    # (start, end) of every part of the input that was understood: ids, emails, pairs, entity names
+    spans: List[Tuple[int, int]]
+
+
+def _coerce(value: str) -> Any:
+    lowered = value.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if value.isdigit():
+        return int(value)
+    if FLOAT_PATTERN.match(value):
+        return float(value)
+    return value
+
+
+def _starts_pair(tokens: List[Token], i: int) -> bool:
+    """True if tokens[i] is a key that opens the next pair ("email to ...", "phone: ...")"""
+    if i + 1 >= len(tokens):
+        return False
+    nxt = tokens[i + 1]
+    if nxt.kind == "assign":
+        return True
+    return (
+        tokens[i].text.lower() in IMPLICIT_FIELDS
+        and nxt.kind == "word"
+        and nxt.text.lower() in CONNECTORS | {"is"}
+    )
+
+
+def _value_end(tokens: List[Token], start: int) -> int:
+    end = start
+    while end < len(tokens):
+        token = tokens[end]
+        if token.kind == "sep":
+            break
+        if token.kind == "word" and (
+            token.text.lower() in STOP_WORDS or (end > start and _starts_pair(tokens, end))
+        ):
+            break
+        end += 1
+    return end
+
+
+def scan(user_input: str) -> Scan:
+    """Single-pass scanner behind parse_field_values and extract_query_filters"""
+    object_ids: List[str] = []
+    emails: List[str] = []
+    tokens: List[Token] = []
+    spans: List[Tuple[int, int]] = []
+    for match in TOKEN_PATTERN.finditer(user_input):
+        kind = match.lastgroup
+        if kind == "oid":
+            object_ids.append(match.group().lower())
+            spans.append(match.span())
+        elif kind == "email":
+            emails.append(match.group())
+            spans.append(match.span())
+        tokens.append(Token(kind, match.group(), match.start(), match.end()))
+
+    fields: Dict[str, Any] = {}
+    filters: Dict[str, Any] = {}
+    entity = None
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.kind != "word":
+            i += 1
+            continue
+        key = token.text.lower()
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        explicit = True
+        if nxt is not None and (nxt.kind == "assign" or (nxt.kind == "word" and nxt.text.lower() in CONNECTORS)):
+            start = i + 2
+        elif key in IMPLICIT_FIELDS or key in IMPLICIT_FILTERS:
+            explicit = False
+            start = i + 1
+            if nxt is not None and nxt.kind in ("word", "assign") and nxt.text.lower() in ("is", "="):
+                start += 1
+        else:
+            if (
+                key in ENTITY_WORDS and nxt is not None and nxt.kind == "word"
+                and nxt.text.isidentifier() and nxt.text.lower() not in NOT_ENTITY_NAMES
+            ):
+                entity = nxt.text
+                spans.append((nxt.start, nxt.end))
+            i += 1
+            continue
+
+        end = _value_end(tokens, start)
+        if end == start:
+            i += 1
+            continue
+        first = tokens[start]
+        raw = user_input[first.start:tokens[end - 1].end].strip().strip("\"'")
+        spans.append((token.start, tokens[end - 1].end))
+        if explicit or key in IMPLICIT_FIELDS:
+            fields[token.text] = _coerce(raw)
+
+        if key in ("email", "mail") and first.kind == "email" and "email" not in filters:
+            filters["email"] = first.text
+        elif key in ("name", "called") and "name" not in filters:
+            filters["name"] = {"$regex": raw, "$options": "i"}
+        elif key == "status" and first.kind == "word" and first.text.isalpha() and "status" not in filters:
+            filters["status"] = first.text
+        elif key in ("id", "_id") and first.kind == "oid" and "_id" not in filters:
+            filters["_id"] = ObjectId(first.text)
+        i = end
+
+    # "contact Nisha", "user John": the entity name wins over a parsed name
+    if entity is not None:
+        filters["name"] = {"$regex": entity, "$options": "i"}
+    return Scan(object_ids, emails, fields, filters, spans)
+
+
+def parse_field_values(user_input: str) -> Dict[str, Any]:
+    """Enhanced field value extraction from natural language"""
+    return scan(user_input).fields
+
+
+def extract_query_filters(user_input: str) -> Dict[str, Any]:
+    """Extract query filters from natural language"""
+    return scan(user_input).filters
+
+
+# Action keywords, checked as whole words. The keyword that appears first in
+# the input wins, so "update contact to new address" is a patch, not an insert.
+ACTION_KEYWORDS = {
+    "insert": ("create", "add", "insert", "new", "register"),
+    "update": ("replace", "overwrite"),
+    "patch": ("update", "modify", "change", "edit", "patch", "set"),
+    "delete": ("delete", "remove", "destroy", "drop"),
+    "get_all": ("list", "get all", "show all", "fetch all", "find all"),
+    "get_one": ("get", "find", "show", "fetch"),
+}
+ACTION_PATTERNS = {
+    action: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")\b", re.I)
+    for action, keywords in ACTION_KEYWORDS.items()
+}
+ALL_PATTERN = re.compile(r"\ball\b", re.I)
+# "do not delete ...", "delete it?? no wait": the user is negating or correcting the command
+NEGATION_PATTERN = re.compile(r"\b(?:not|no|never|don't|dont|cannot|can't|won't)\b|n't\b", re.I)
+WORD_PATTERN = re.compile(r"[\w']+")
+
+# Words a confident plan may contain besides its action, schema and parsed values
+# ("show me all the users", "get user with id ..."); anything else went unparsed
+ACTION_WORDS = {word for keywords in ACTION_KEYWORDS.values() for keyword in keywords for word in keyword.split()}
+FILLER_WORDS = {
+    "a", "an", "the", "all", "every", "each", "any", "me", "my", "our", "us", "please",
+    "of", "in", "from", "records", "documents", "entries", "items", "rows", "everything",
+    "with", "where", "whose", "and", "by",
+}
+
+# Words that show a parsed value ran on into the next clause ("John and email ...",
+# "done for all tasks")
+CLAUSE_WORDS = {"and", "to", "with", "is", "as", "set", "where", "whose", "for", "if", "unless", "all", "then"}
+
+# Confidence weights; a plan scores 1.0 when action, schema and target are all explicit
+ACTION_WEIGHT = 0.4
+SCHEMA_WEIGHT = 0.4
+TARGET_WEIGHT = 0.2
+
+
+def _singular(name: str) -> str:
+    if name.endswith("ies"):
+        return name[:-3] + "y"
+    return name[:-1] if name.endswith("s") else name
+
+
+def _schema_pattern(name: str) -> "re.Pattern":
+    # "chat_lists" also matches "chat list" / "chat-lists"
+    forms = {name, _singular(name)}
+    words = [re.escape(form).replace("_", "[_ -]?") for form in forms]
+    return re.compile(r"\b(?:" + "|".join(sorted(words, key=len, reverse=True)) + r")\b", re.I)
+
+
+class RulePlanner:
+    """Deterministic keyword planner, scored so the LLM is only used when it is unsure"""
+
+    def __init__(self, schema_fields: Dict[str, Iterable[str]], default_schema: str = "users"):
+        self.schema_fields = {name: set(fields) | {"_id"} for name, fields in schema_fields.items()}
+        # Pydantic model_fields also say which fields an insert cannot do without
+        self.required_fields = {
+            name: {field for field, info in fields.items() if info.is_required()} if isinstance(fields, dict) else set()
+            for name, fields in schema_fields.items()
+        }
+        self.schema_patterns = {name: _schema_pattern(name) for name in self.schema_fields}
+        self.default_schema = default_schema
+
+    def detect_action(self, user_input: str) -> Tuple[str, float]:
+        hits = []
+        for order, (action, pattern) in enumerate(ACTION_PATTERNS.items()):
+            match = pattern.search(user_input)
+            if match:
+                hits.append((match.start(), order, action))
+        if not hits:
+            return "get_all", 0.0
+
+        _, _, action = min(hits)
+        if action == "get_one" and ALL_PATTERN.search(user_input):
+            action = "get_all"
+        # Competing verbs ("create ... then delete") make the guess less certain
+        confidence = ACTION_WEIGHT if len({hit[2] for hit in hits} - {"get_one"}) <= 1 else ACTION_WEIGHT / 2
+        return action, confidence
+
+    def detect_schema(self, user_input: str) -> Tuple[str, float]:
+        hits = []
+        for name, pattern in self.schema_patterns.items():
+            match = pattern.search(user_input)
+            if match:
+                hits.append((match.start(), name))
+        if not hits:
+            return self.default_schema, 0.0
+        _, name = min(hits)
+        return name, SCHEMA_WEIGHT if len(hits) == 1 else SCHEMA_WEIGHT / 2
+
+    def _known_fields(self, schema: str, values: Optional[dict]) -> bool:
+        """True if every key is a schema field and no value swallowed another clause"""
+        if not values:
+            return False
+        fields = self.schema_fields.get(schema, set())
+        if not set(values) <= fields:
+            return False
+        lowered = {field.lower() for field in fields} | CLAUSE_WORDS
+        for value in values.values():
+            if isinstance(value, str) and any(word.lower() in lowered for word in value.split()):
+                return False
+        return True
+
+    def _nothing_left(self, schema: str, user_input: str, scanned: Scan) -> bool:
+        """True if nothing but action, schema, filler words and parsed spans is left.
+
+        "delete contact <oid> if status is active" leaves "if", so the condition
+        the planner cannot express is not silently dropped.
+        """
+        text = user_input
+        for start, end in scanned.spans:
+            text = text[:start] + " " * (end - start) + text[end:]
+        text = self.schema_patterns[schema].sub(" ", text)
+        return all(word in ACTION_WORDS or word in FILLER_WORDS for word in WORD_PATTERN.findall(text.lower()))
+
+    def _query_score(self, schema: str, query: dict) -> float:
+        """1.0 for exact filters on known fields, 0.25 when a value is a regex guessed from prose"""
+        if not set(query) <= self.schema_fields.get(schema, set()):
+            return 0.0
+        exact = {key: value for key, value in query.items() if not isinstance(value, dict)}
+        if exact and not self._known_fields(schema, exact):
+            return 0.0
+        return 1.0 if len(exact) == len(query) else 0.25
+
+    def plan(self, user_input: str) -> Tuple[Dict[str, Any], float]:
+        """Return ({action, schema, item_id, item_ids, item, query}, confidence in [0, 1]).
+
+        Set-based writes (*_many) never score a target, so the LLM confirms them,
+        and are planned as a preview (count only) should one be adopted unconfirmed;
+        negated or corrected commands score 0.
+        """
+        action, action_score = self.detect_action(user_input)
+        schema, schema_score = self.detect_schema(user_input)
+
+        scanned = scan(user_input)
+        item_id = scanned.object_ids[0] if action != "insert" and scanned.object_ids else None
+        item_ids = None
+        if item_id and len(scanned.object_ids) > 1:
+            # Several ids: one $in lookup for reads, a set-based write (confirmed by the LLM) otherwise
+            item_id = None
+            if action in ("get_one", "get_all"):
+                item_ids = scanned.object_ids
+            else:
+                action = f"{action}_many"
+        # "delete all tasks whose status is done" is one set-based write, not a single-document one
+        if action in ("update", "patch", "delete") and not item_id and ALL_PATTERN.search(user_input):
+            action = f"{action}_many"
+
+        item = scanned.fields if action in ("insert", "update", "patch", "update_many", "patch_many") else None
+        if action.endswith("_many") and len(scanned.object_ids) > 1:
+            query = {"_id": {"$in": [ObjectId(object_id) for object_id in scanned.object_ids]}}
+        else:
+            query = scanned.filters if action != "insert" and not (item_id or item_ids) else {}
+
+        # Target score: the operation has what it needs, using fields the schema knows.
+        # Writes addressed by a guessed filter rather than an id always go to the LLM.
+        target_score = 0.0
+        if action == "get_all" and not item_ids:
+            # Trusted only if no constraint went unparsed ("... where age > 30"), checked below
+            target_score = TARGET_WEIGHT * self._query_score(schema, query) if query else TARGET_WEIGHT
+        elif action == "insert":
+            complete = self.required_fields.get(schema, set()) <= set(item)
+            target_score = TARGET_WEIGHT if complete and self._known_fields(schema, item) else 0.0
+        elif item_id or item_ids:
+            target_score = TARGET_WEIGHT
+        elif action == "get_one" and query:
+            target_score = TARGET_WEIGHT / 2 * self._query_score(schema, query)
+        if action in ("update", "patch") and not self._known_fields(schema, item):
+            target_score = 0.0
+        # Whatever went unparsed ("if ...", "unless ...", "and priority high") is for the LLM
+        if target_score and not self._nothing_left(schema, user_input, scanned):
+            target_score = 0.0
+
+        plan = {
+            "action": action,
+            "schema": schema,
+            "item_id": item_id,
+            "item_ids": item_ids,
+            "item": item,
+            "query": query,
+        }
+        if action.endswith("_many"):
+            plan["preview"] = True
+        # Negations and corrections ("do not delete ...", "... no wait, get it") always go to the LLM
+        if NEGATION_PATTERN.search(user_input):
+            return plan, 0.0
+        return plan, round(action_score + schema_score + target_score, 4)
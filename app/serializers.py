@@ -1,22 +1,75 @@
-from bson import ObjectId
-from typing import Any, List, Dict
-from fastapi.encoders import jsonable_encoder
-
-class MongoJSONEncoder:
-    """Custom encoder for MongoDB documents"""
-    @staticmethod
-    def encode(obj: Any) -> Any:
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        if isinstance(obj, list):
-            return [MongoJSONEncoder.encode(item) for item in obj]
-        if isinstance(obj, dict):
-            return {key: MongoJSONEncoder.encode(value) for key, value in obj.items()}
-        return obj
+import base64
+from decimal import Decimal
+from typing import Any
+
+import bson
+import orjson
+import ormsgpack
+from bson import Decimal128, ObjectId
+from bson.raw_bson import RawBSONDocument
+from fastapi.encoders import decimal_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from .raw_bson import raw_to_jsonable
+
+
+def bson_default(obj: Any) -> Any:
+    """orjson fallback for the BSON/Python types it does not encode natively
+    (datetime, UUID, int subclasses such as Int64 are handled by orjson itself)"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, RawBSONDocument):
+        return raw_to_jsonable(obj)
+    if isinstance(obj, Decimal128):
+        return decimal_encoder(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return decimal_encoder(obj)
+    if isinstance(obj, bytes):
+        return base64.b64encode(obj).decode("ascii")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode MongoDB documents straight to JSON bytes in a single pass"""
+    return orjson.dumps(obj, default=bson_default)
+
+
+# Naive datetimes from pymongo are UTC; send them as the msgpack timestamp extension type
+MSGPACK_OPTIONS = ormsgpack.OPT_NAIVE_UTC | ormsgpack.OPT_DATETIME_AS_TIMESTAMP_EXT
+
+
+def msgpack_default(obj: Any) -> Any:
+    """ormsgpack fallback; bytes are packed as msgpack bin, so only bson_default's other cases apply"""
+    if isinstance(obj, RawBSONDocument):
+        return bson.decode(obj.raw)
+    return bson_default(obj)
+
+
+def packb(obj: Any) -> bytes:
+    return ormsgpack.packb(obj, default=msgpack_default, option=MSGPACK_OPTIONS)
+
 
 def serialize_mongodb_doc(doc: Any) -> Any:
     """Convert MongoDB document to JSON-serializable format"""
-    # First use our custom encoder
-    encoded = MongoJSONEncoder.encode(doc)
-    # Then use FastAPI's encoder for any remaining conversions
-    return jsonable_encoder(encoded)
\ No newline at end of file
+    # Encode and decode in C rather than rebuilding every dict and list in Python
+    return orjson.loads(dumps(doc))
+
+
+class MongoJSONResponse(JSONResponse):
+    """JSONResponse that renders BSON documents with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class MongoMsgPackResponse(Response):
+    """MessagePack rendering of the same content, for Accept: application/msgpack"""
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return packb(content)
@@ -0,0 +1,113 @@
+import base64
+import binascii
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+def encode_cursor(last_id: ObjectId) -> str:
+    """Opaque keyset-pagination token for the last _id of a page"""
+    return base64.urlsafe_b64encode(last_id.binary).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> ObjectId:
+    """Inverse of encode_cursor; a plain 24-hex ObjectId is accepted too"""
+    if ObjectId.is_valid(token):
+        return ObjectId(token)
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        return ObjectId(raw)
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        raise ValueError(f"Invalid page cursor: {token}")
+
+
+def parse_projection(fields: Optional[str], allowed: Iterable[str]) -> Optional[Dict[str, int]]:
+    """Turn "name,email" into a Mongo projection, rejecting fields the schema does not have"""
+    if not fields:
+        return None
+    allowed = set(allowed) | {"_id"}
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # _id is always returned: the page cursor is built from it
+    return {name: 1 for name in names}
+
+
+SORT_DIRECTIONS = {1: 1, -1: -1, "asc": 1, "ascending": 1, "desc": -1, "descending": -1}
+
+
+def _check_fields(names: Iterable[str], allowed: set) -> None:
+    # "address.city" is checked by its top-level field
+    unknown = [name for name in names if name.split(".")[0] not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+
+def parse_sort(sort: Any, allowed: Iterable[str]) -> Optional[List[Tuple[str, int]]]:
+    """Accept {"createdAt": -1}, [["createdAt", "desc"]], ["-createdAt", "name"] or "-createdAt" """
+    if not sort:
+        return None
+    if isinstance(sort, dict):
+        pairs = list(sort.items())
+    else:
+        pairs = []
+        for key in [sort] if isinstance(sort, str) else sort:
+            if isinstance(key, str):
+                pairs.append((key[1:], -1) if key.startswith("-") else (key, 1))
+            else:
+                pairs.append(tuple(key))
+    keys = []
+    for pair in pairs:
+        if len(pair) != 2:
+            raise ValueError(f"Invalid sort key: {pair}")
+        field, direction = pair
+        direction = direction.lower() if isinstance(direction, str) else direction
+        if direction not in SORT_DIRECTIONS:
+            raise ValueError(f"Invalid sort direction for {field}: {direction}")
+        keys.append((field, SORT_DIRECTIONS[direction]))
+    _check_fields([field for field, _ in keys], set(allowed) | {"_id"})
+    return keys
+
+
+def find_options(plan: Dict[str, Any], allowed: Iterable[str], default_limit: Optional[int],
+                 max_limit: Optional[int]) -> Dict[str, Any]:
+    """projection/sort/limit/skip/hint of a plan as find() keyword arguments, checked against the schema.
+
+    With no default_limit/max_limit only the plan's own limit applies (streams).
+    """
+    allowed = set(allowed) | {"_id"}
+    options: Dict[str, Any] = {}
+
+    projection = plan.get("projection")
+    if projection:
+        if not isinstance(projection, dict):
+            projection = {name: 1 for name in projection}
+        _check_fields(projection, allowed)
+        if any(value not in (0, 1) for value in projection.values()):
+            raise ValueError("Projection values must be 0 or 1")
+        options["projection"] = {name: int(value) for name, value in projection.items()}
+
+    sort = parse_sort(plan.get("sort"), allowed)
+    if sort:
+        options["sort"] = sort
+
+    limit = plan.get("limit") or default_limit
+    if limit is not None:
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError(f"Invalid limit: {limit}")
+        options["limit"] = limit if max_limit is None else min(limit, max_limit)
+
+    skip = int(plan.get("skip") or 0)
+    if skip < 0:
+        raise ValueError(f"Invalid skip: {skip}")
+    if skip:
+        options["skip"] = skip
+
+    # An index name is passed through; a key pattern must use schema fields
+    hint = plan.get("hint")
+    if hint:
+        options["hint"] = hint if isinstance(hint, str) else parse_sort(hint, allowed)
+    return options
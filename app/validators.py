@@ -0,0 +1,65 @@
+from typing import Any, Dict, List, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+
+class SchemaValidators:
+    """Validators for every schema, built once and reused by each write.
+
+    validate(): a whole document, as cls(**item).model_dump(exclude_unset=True)
+    validate_partial(): only the given fields, each against its own annotation (patches)
+    validate_many(): a list of documents in one call into pydantic-core (bulk writes)
+    """
+
+    def __init__(self, schema_map: Dict[str, Type[BaseModel]]):
+        self.models: Dict[str, TypeAdapter] = {}
+        self.lists: Dict[str, TypeAdapter] = {}
+        self.fields: Dict[str, Dict[str, TypeAdapter]] = {}
+        self.titles: Dict[str, str] = {}
+        # Most fields share an annotation (Optional[str], Optional[Any]...): one adapter each
+        by_annotation: Dict[Any, TypeAdapter] = {}
+        for name, cls in schema_map.items():
+            self.titles[name] = cls.__name__
+            self.models[name] = TypeAdapter(cls)
+            self.lists[name] = TypeAdapter(List[cls])
+            self.fields[name] = {}
+            for field, info in cls.model_fields.items():
+                annotation = info.rebuild_annotation()
+                if annotation not in by_annotation:
+                    by_annotation[annotation] = TypeAdapter(annotation)
+                self.fields[name][field] = by_annotation[annotation]
+
+    def __contains__(self, schema: str) -> bool:
+        return schema in self.models
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def validate(self, schema: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        adapter = self.models[schema]
+        return adapter.dump_python(adapter.validate_python(item), exclude_unset=True)
+
+    def validate_partial(self, schema: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate the fields being patched; keys the schema does not declare are dropped"""
+        fields = self.fields[schema]
+        validated = {}
+        errors = []
+        for field, value in item.items():
+            adapter = fields.get(field)
+            if adapter is None:
+                continue
+            try:
+                validated[field] = adapter.dump_python(adapter.validate_python(value))
+            except ValidationError as e:
+                # Report under the field name, as validating the whole model would
+                for error in e.errors(include_url=False):
+                    error["loc"] = (field, *error["loc"])
+                    error.pop("msg")
+                    errors.append(error)
+        if errors:
+            raise ValidationError.from_exception_data(self.titles[schema], errors)
+        return validated
+
+    def validate_many(self, schema: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        adapter = self.lists[schema]
+        return adapter.dump_python(adapter.validate_python(items), exclude_unset=True)
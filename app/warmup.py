@@ -0,0 +1,70 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, Optional
+
+from . import db
+from .config import MONGO_MIN_POOL_SIZE, WARMUP_CONNECTIONS, WARMUP_LLM
+from .genai_router import get_llm, get_rule_planner, get_validators, load_plan_caches
+
+
+async def _step(report: Dict[str, Any], name: str, fn: Callable[[], Any]) -> None:
+    """Run one warmup step; a failure is reported, never raised, so startup continues"""
+    start = time.perf_counter()
+    entry: Dict[str, Any] = {"ok": True}
+    try:
+        detail = fn()
+        if inspect.isawaitable(detail):
+            detail = await detail
+        if detail is not None:
+            entry["detail"] = detail
+    except Exception as e:
+        print(f"Warmup step {name} failed: {e}")
+        entry = {"ok": False, "error": str(e)}
+    entry["ms"] = round((time.perf_counter() - start) * 1000, 1)
+    report["steps"][name] = entry
+
+
+async def open_connections(count: int) -> int:
+    """Open pooled connections up front: concurrent pings each check out their own socket"""
+    database = db.get_async_db()
+    count = max(1, count, MONGO_MIN_POOL_SIZE)
+    await asyncio.gather(*(database.command("ping") for _ in range(count)))
+    return count
+
+
+def build_validators() -> int:
+    """Import every schema and build the validator registry and the rule planner"""
+    validators = get_validators()
+    get_rule_planner()
+    return len(validators)
+
+
+async def load_catalog() -> int:
+    return len(await db.acollection_names(max_age=0))
+
+
+async def open_llm_channel() -> int:
+    # countTokens is free and goes over the same channel as generateContent
+    return await asyncio.to_thread(get_llm().get_num_tokens, "ping")
+
+
+async def warmup(compile_graph: Optional[Callable[[], Any]] = None, llm: bool = WARMUP_LLM) -> Dict[str, Any]:
+    """Prime the Mongo pool, validators, collection catalog, plan caches and
+    (optionally) the Gemini channel. Returns per-step timings and errors."""
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"steps": {}}
+    await _step(report, "mongo_pool", lambda: open_connections(WARMUP_CONNECTIONS))
+    await _step(report, "validators", build_validators)
+    await _step(report, "collection_catalog", load_catalog)
+    await _step(report, "plan_caches", load_plan_caches)
+    if compile_graph is not None:
+        def build_graph() -> None:
+            compile_graph()
+
+        await _step(report, "graph", build_graph)
+    if llm:
+        await _step(report, "llm_channel", open_llm_channel)
+    report["ok"] = all(step["ok"] for step in report["steps"].values())
+    report["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
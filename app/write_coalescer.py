@@ -0,0 +1,174 @@
+import asyncio
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, ClientBulkWriteException
+from pymongo.operations import DeleteOne, InsertOne, ReplaceOne, UpdateOne
+from pymongo.results import InsertOneResult
+
+from .batcher import MicroBatcher
+
+# MongoDB 8.0: first server with the client-level bulkWrite command, which
+# reports a result per operation
+CLIENT_BULK_WRITE_WIRE_VERSION = 25
+
+
+class NotExecutedError(Exception):
+    """An ordered bulk write stopped before reaching this operation"""
+
+
+class PendingWrite(NamedTuple):
+    kind: str  # insert | update | replace | delete
+    filter: Optional[Mapping[str, Any]] = None
+    document: Optional[Mapping[str, Any]] = None
+    upsert: bool = False
+
+    def model(self, namespace: Optional[str] = None):
+        """The pymongo bulk write model for this write"""
+        extra = {"namespace": namespace} if namespace else {}
+        if self.kind == "insert":
+            return InsertOne(self.document, **extra)
+        if self.kind == "update":
+            return UpdateOne(self.filter, self.document, upsert=self.upsert, **extra)
+        if self.kind == "replace":
+            return ReplaceOne(self.filter, self.document, upsert=self.upsert, **extra)
+        return DeleteOne(self.filter, **extra)
+
+
+class CoalescedCollection:
+    """insert_one/update_one/replace_one/delete_one with the collection API,
+    buffered and sent to the server as bulk writes"""
+
+    def __init__(self, coalescer: "WriteCoalescer", name: str):
+        self.coalescer = coalescer
+        self.name = name
+
+    async def insert_one(self, document: Dict[str, Any]):
+        # Assign the _id up front so it can be handed back from a bulk insert
+        document.setdefault("_id", ObjectId())
+        return await self.coalescer.submit(self.name, PendingWrite("insert", document=document))
+
+    async def update_one(self, filter_: Mapping[str, Any], update: Mapping[str, Any], upsert: bool = False):
+        return await self.coalescer.submit(self.name, PendingWrite("update", filter_, update, upsert))
+
+    async def replace_one(self, filter_: Mapping[str, Any], replacement: Dict[str, Any], upsert: bool = False):
+        return await self.coalescer.submit(self.name, PendingWrite("replace", filter_, replacement, upsert))
+
+    async def delete_one(self, filter_: Mapping[str, Any]):
+        return await self.coalescer.submit(self.name, PendingWrite("delete", filter_))
+
+
+class WriteCoalescer:
+    """Merge concurrent single-document writes per collection into bulk writes.
+
+    Writes are buffered for window_ms (or until max_batch_size) and flushed as:
+    - inserts only: one collection.bulk_write; each caller gets its own _id
+    - mixed writes on MongoDB >= 8.0: one client.bulk_write(verbose_results=True),
+      which reports matched/modified/deleted counts per operation
+    - mixed writes on older servers: the individual *_one calls, since a
+      collection bulk_write only reports totals for the whole batch
+    """
+
+    def __init__(self, client, database, window_ms: float = 2, max_batch_size: int = 500,
+                 ordered: bool = False):
+        self.client = client
+        self.database = database
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.ordered = ordered
+        self._batchers: Dict[str, MicroBatcher] = {}
+        self._client_bulk: Optional[bool] = None
+
+    def collection(self, name: str) -> CoalescedCollection:
+        return CoalescedCollection(self, name)
+
+    async def submit(self, name: str, write: PendingWrite):
+        batcher = self._batchers.get(name)
+        if batcher is None:
+            async def flush(writes, name=name):
+                return await self._flush(name, writes)
+
+            batcher = MicroBatcher(flush, self.max_batch_size, self.window_ms)
+            self._batchers[name] = batcher
+        return await batcher.submit(write)
+
+    async def _supports_client_bulk_write(self) -> bool:
+        if self._client_bulk is None:
+            hello = await self.database.command("hello")
+            self._client_bulk = hello.get("maxWireVersion", 0) >= CLIENT_BULK_WRITE_WIRE_VERSION
+        return self._client_bulk
+
+    async def _flush(self, name: str, writes: List[PendingWrite]) -> List[Any]:
+        collection = self.database[name]
+        if len(writes) == 1:
+            return [await self._run_one(collection, writes[0])]
+        if all(write.kind == "insert" for write in writes):
+            return await self._flush_inserts(collection, writes)
+        if await self._supports_client_bulk_write():
+            return await self._flush_client_bulk(name, writes)
+        if not self.ordered:
+            return await asyncio.gather(
+                *(self._run_one(collection, write) for write in writes), return_exceptions=True
+            )
+        results = []
+        for write in writes:
+            try:
+                results.append(await self._run_one(collection, write))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    @staticmethod
+    async def _run_one(collection, write: PendingWrite):
+        if write.kind == "insert":
+            return await collection.insert_one(write.document)
+        if write.kind == "update":
+            return await collection.update_one(write.filter, write.document, upsert=write.upsert)
+        if write.kind == "replace":
+            return await collection.replace_one(write.filter, write.document, upsert=write.upsert)
+        return await collection.delete_one(write.filter)
+
+    async def _flush_inserts(self, collection, writes: List[PendingWrite]) -> List[Any]:
+        errors: Dict[int, Exception] = {}
+        try:
+            await collection.bulk_write([write.model() for write in writes], ordered=self.ordered)
+            executed = len(writes)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            for error in write_errors:
+                errors[error["index"]] = Exception(error.get("errmsg", "Write failed"))
+            executed = write_errors[0]["index"] + 1 if self.ordered and write_errors else len(writes)
+
+        results: List[Any] = []
+        for index, write in enumerate(writes):
+            if index in errors:
+                results.append(errors[index])
+            elif index >= executed:
+                results.append(NotExecutedError("Earlier write in the batch failed"))
+            else:
+                results.append(InsertOneResult(write.document["_id"], True))
+        return results
+
+    async def _flush_client_bulk(self, name: str, writes: List[PendingWrite]) -> List[Any]:
+        namespace = f"{self.database.name}.{name}"
+        models = [write.model(namespace) for write in writes]
+        errors: Dict[int, Exception] = {}
+        try:
+            result = await self.client.bulk_write(models, ordered=self.ordered, verbose_results=True)
+        except ClientBulkWriteException as e:
+            result = e.partial_result
+            for error in e.write_errors or []:
+                errors[error["idx"]] = Exception(error.get("errmsg", "Write failed"))
+            if result is None or not result.has_verbose_results:
+                raise
+
+        per_op = {**result.insert_results, **result.update_results, **result.delete_results}
+        results: List[Any] = []
+        for index in range(len(writes)):
+            if index in errors:
+                results.append(errors[index])
+            elif index in per_op:
+                results.append(per_op[index])
+            else:
+                results.append(NotExecutedError("Earlier write in the batch failed"))
+        return results
@@ -0,0 +1,49 @@
+"""Cost of turning a batch of BSON documents (as read off the wire) into a JSON response.
+
+    python -m benchmarks.bench_raw_bson [--sizes 100 10000] [--repeat 5]
+
+decoded: the default read path, dict documents + serialize_mongodb_doc + dumps
+raw:     RAW_BSON_READS=on, RawBSONDocument decoded only while writing the response
+"""
+import argparse
+import timeit
+
+import bson
+
+from app.raw_bson import raw_codec_options
+from app.serializers import dumps, serialize_mongodb_doc
+from benchmarks.bench_serializers import make_docs
+
+RAW = raw_codec_options()
+
+
+def decoded_response(batch):
+    docs = bson.decode_all(batch)
+    return dumps({"result": {"success": True, "data": [serialize_mongodb_doc(doc) for doc in docs]}})
+
+
+def raw_response(batch):
+    docs = bson.decode_all(batch, RAW)
+    return dumps({"result": {"success": True, "data": docs}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        batch = b"".join(bson.encode(doc) for doc in make_docs(size))
+        assert decoded_response(batch) == raw_response(batch)
+        number = max(1, 2000 // size)
+        timings = {}
+        for name, fn in (("decoded", decoded_response), ("raw", raw_response)):
+            best = min(timeit.repeat(lambda: fn(batch), number=number, repeat=args.repeat))
+            timings[name] = best / number * 1000
+        print(f"{size:>6} docs  decoded {timings['decoded']:9.3f} ms  raw {timings['raw']:9.3f} ms  "
+              f"({timings['decoded'] / timings['raw']:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
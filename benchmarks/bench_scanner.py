@@ -0,0 +1,86 @@
+"""Per-input cost of the natural-language field parsing done by the rule planner.
+
+    python -m benchmarks.bench_scanner [--number 20000] [--repeat 5]
+
+legacy: the previous parse_field_values + extract_query_filters, ten re.findall/re.search calls
+scan:   one precompiled single-pass scan() feeding both
+"""
+import argparse
+import re
+import timeit
+
+from app.rule_planner import scan
+
+INPUTS = [
+    "create user with name John and email john@example.com",
+    "set status to active",
+    "name: Alice, email = alice@example.com",
+    "update user 68b97d478273e995d0dcdeed set name to Jacob email to jacob@example.com",
+    'get contacts whose status is active and name is "Bob"',
+    "delete contact id 68b97d478273e995d0dcdeed",
+    "change contact Nisha message to hello",
+]
+
+
+def legacy_parse_field_values(user_input):
+    item = {}
+    patterns = [
+        r'(?:set|create|add|with)\s+([\w_]+)\s+(?:to\s+|as\s+|=\s*|:\s*)(["\']?[^,\n]+["\']?)',
+        r'([\w_]+)\s*[:=]\s*(["\']?[^,\n]+["\']?)',
+        r'(name|email|phone|title|description|status)\s+(?:is\s+)?(["\']?[^,\n]+["\']?)',
+        r'([\w_]+)\s+to\s+(["\']?[^,\n]+["\']?)',
+    ]
+    for pattern in patterns:
+        for field, value in re.findall(pattern, user_input, re.IGNORECASE):
+            value = value.strip().strip('"\'')
+            if value.lower() in ['true', 'false']:
+                item[field] = value.lower() == 'true'
+            elif value.isdigit():
+                item[field] = int(value)
+            elif re.match(r'^\d+\.\d+$', value):
+                item[field] = float(value)
+            else:
+                item[field] = value
+    return item
+
+
+def legacy_extract_query_filters(user_input):
+    query = {}
+    email_match = re.search(r'(?:email|mail)\s+(?:is\s+|=\s*)?([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', user_input, re.I)
+    if email_match:
+        query["email"] = email_match.group(1)
+    name_match = re.search(r'(?:name|called)\s+(?:is\s+|=\s*)?["\']?([^"\']+)["\']?', user_input, re.I)
+    if name_match:
+        query["name"] = {"$regex": name_match.group(1), "$options": "i"}
+    status_match = re.search(r'status\s+(?:is\s+|=\s*)?([a-zA-Z]+)', user_input, re.I)
+    if status_match:
+        query["status"] = status_match.group(1)
+    id_match = re.search(r'(?:id|_id)\s+(?:is\s+|=\s*)?([a-f0-9]{24})', user_input, re.I)
+    if id_match:
+        query["_id"] = id_match.group(1)
+    entity_match = re.search(r'(?:user|contact|customer|employee)\s+([A-Za-z0-9_]+)', user_input, re.I)
+    if entity_match:
+        query["name"] = {"$regex": entity_match.group(1), "$options": "i"}
+    return query
+
+
+def legacy(user_input):
+    return legacy_parse_field_values(user_input), legacy_extract_query_filters(user_input)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = {}
+    for name, fn in (("legacy", legacy), ("scan", scan)):
+        best = min(timeit.repeat(lambda: [fn(text) for text in INPUTS], number=args.number, repeat=args.repeat))
+        timings[name] = best / (args.number * len(INPUTS)) * 1e6
+    print(f"legacy {timings['legacy']:7.2f} us/input  scan {timings['scan']:7.2f} us/input  "
+          f"({timings['legacy'] / timings['scan']:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
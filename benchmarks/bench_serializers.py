@@ -0,0 +1,80 @@
+"""Compare the orjson serializer with the previous MongoJSONEncoder + jsonable_encoder path.
+
+    python -m benchmarks.bench_serializers [--sizes 100 10000] [--repeat 5]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+
+from bson import Decimal128, ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.serializers import dumps, serialize_mongodb_doc
+
+
+def legacy_encode(obj):
+    """The pre-orjson MongoJSONEncoder.encode"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, list):
+        return [legacy_encode(item) for item in obj]
+    if isinstance(obj, dict):
+        return {key: legacy_encode(value) for key, value in obj.items()}
+    return obj
+
+
+def legacy_response(docs):
+    # Per-document serialize_mongodb_doc in the node, then JSONResponse's json.dumps
+    data = [jsonable_encoder(legacy_encode(doc)) for doc in docs]
+    return json.dumps({"result": {"success": True, "data": data}}).encode("utf-8")
+
+
+def orjson_response(docs):
+    return dumps({"result": {"success": True, "data": docs}})
+
+
+def make_docs(count):
+    created = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Contact {i}",
+            "email": f"contact{i}@example.com",
+            "mobile": f"+1555{i:07d}",
+            "message": "Hello there, please call me back about the order. " * 3,
+            "tags": ["lead", "web", f"batch-{i % 10}"],
+            "owner": {"_id": ObjectId(), "name": "Sales", "score": i * 0.5},
+            "balance": Decimal128(f"{i}.25"),
+            "createdAt": created + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def bench(fn, docs, repeat):
+    number = max(1, 2000 // len(docs))
+    best = min(timeit.repeat(lambda: fn(docs), number=number, repeat=repeat))
+    return best / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        docs = make_docs(size)
+        # Decimal128 was never supported by the old path; compare on what it can encode
+        legacy_docs = [{k: v for k, v in doc.items() if k != "balance"} for doc in docs]
+        assert json.loads(orjson_response(legacy_docs)) == json.loads(legacy_response(legacy_docs))
+        old = bench(legacy_response, legacy_docs, args.repeat)
+        new = bench(orjson_response, legacy_docs, args.repeat)
+        round_trip = bench(lambda d: [serialize_mongodb_doc(doc) for doc in d], legacy_docs, args.repeat)
+        print(f"{size:>6} docs  legacy {old:9.3f} ms  orjson {new:9.3f} ms  "
+              f"({old / new:5.1f}x)  serialize_mongodb_doc {round_trip:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
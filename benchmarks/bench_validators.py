@@ -0,0 +1,78 @@
+"""Validation cost per write for every schema in app/schemas/all_schemas.py.
+
+    python -m benchmarks.bench_validators [--number 2000] [--repeat 5] [--batch 100]
+
+model:    cls(**item).dict(exclude_unset=True), what each write used to do
+registry: SchemaValidators.validate with the adapter built once
+patch:    merge with the stored document + full model (old patch) vs validate_partial
+many:     a loop of validate vs one validate_many call, per document
+"""
+import argparse
+import timeit
+import warnings
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.genai_router import get_schema_map
+from app.validators import SchemaValidators
+
+CANDIDATES = ("text", True, 7, ["a"], {"k": "v"})
+
+
+def sample_item(cls) -> dict:
+    """A value for every field, the first candidate its annotation accepts"""
+    item = {}
+    for field, info in cls.model_fields.items():
+        adapter = TypeAdapter(info.rebuild_annotation())
+        for value in CANDIDATES:
+            try:
+                adapter.validate_python(value, strict=True)
+            except ValidationError:
+                continue
+            item[field] = value
+            break
+    return item
+
+
+def per_call_us(fn, number: int, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    schema_map = get_schema_map()
+    validators = SchemaValidators(schema_map)
+    totals = dict.fromkeys(("model", "registry", "old patch", "partial", "loop", "many"), 0.0)
+    print(f"{'schema':<16}{'model':>9}{'registry':>10}{'old patch':>11}{'partial':>9}{'loop':>8}{'many':>8}  (us/write)")
+    for name, cls in schema_map.items():
+        item = sample_item(cls)
+        patch = dict(list(item.items())[:2])
+        batch = [item] * args.batch
+        assert validators.validate(name, item) == cls(**item).dict(exclude_unset=True)
+        timings = {
+            "model": per_call_us(lambda: cls(**item).dict(exclude_unset=True), args.number, args.repeat),
+            "registry": per_call_us(lambda: validators.validate(name, item), args.number, args.repeat),
+            "old patch": per_call_us(
+                lambda: cls(**{**item, **patch}).dict(include=set(patch)), args.number, args.repeat),
+            "partial": per_call_us(lambda: validators.validate_partial(name, patch), args.number, args.repeat),
+            "loop": per_call_us(
+                lambda: [validators.validate(name, doc) for doc in batch], args.number // args.batch or 1, args.repeat
+            ) / args.batch,
+            "many": per_call_us(
+                lambda: validators.validate_many(name, batch), args.number // args.batch or 1, args.repeat
+            ) / args.batch,
+        }
+        for key, value in timings.items():
+            totals[key] += value
+        print(f"{name:<16}" + "".join(f"{timings[key]:{width}.2f}" for key, width in zip(totals, (9, 10, 11, 9, 8, 8))))
+    print(f"{'all schemas':<16}" + "".join(f"{totals[key]:{width}.2f}" for key, width in zip(totals, (9, 10, 11, 9, 8, 8))))
+
+
+if __name__ == "__main__":
+    main()
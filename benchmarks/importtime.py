@@ -0,0 +1,72 @@
+"""Boot-time profile of `import app.main` from `python -X importtime`.
+
+    python -m benchmarks.importtime [--runs 5] [--top 15] [--budget-ms 900]
+
+Prints the best total over --runs fresh interpreters and the slowest modules
+(cumulative), then exits non-zero if the total exceeds the budget or a module
+that must stay lazy (LLM client, LangGraph, schemas) was imported at boot.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Built on first use or in the FastAPI lifespan, never at import
+LAZY_MODULES = ("langchain_google_genai", "langgraph", "app.schemas.all_schemas")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profile(module: str = "app.main") -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every import, in import order"""
+    env = dict(os.environ, LANGSMITH_TRACING="false", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "900")))
+    args = parser.parse_args()
+
+    best: List[Tuple[str, int, int]] = []
+    best_total = None
+    for _ in range(args.runs):
+        rows = profile(args.module)
+        total: Dict[str, int] = {name: cumulative for name, _, cumulative in rows}
+        if best_total is None or total[args.module] < best_total:
+            best, best_total = rows, total[args.module]
+
+    print(f"import {args.module}: {best_total / 1000:.1f} ms (best of {args.runs})")
+    for name, self_us, cumulative_us in sorted(best, key=lambda row: -row[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {self_us / 1000:7.1f} ms self  {name}")
+
+    failures = []
+    imported = {name for name, _, _ in best}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    if eager:
+        failures.append(f"imported at boot but should be lazy: {', '.join(eager)}")
+    if best_total / 1000 > args.budget_ms:
+        failures.append(f"{best_total / 1000:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
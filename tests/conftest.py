@@ -13,7 +13,9 @@ def pytest_configure():
 @pytest.fixture(autouse=True)
 def mock_mongodb():
     """Mock MongoDB client and connection"""
-    with patch('genai_crud_agent.app.genai_router.MongoClient') as mock_client:
+    # The shared client is created on first use; start each test without one
+    with patch('genai_crud_agent.app.db.MongoClient') as mock_client, \
+            patch('genai_crud_agent.app.db._client', None):
         # Create mock database
         mock_db = Mock()
         
@@ -54,7 +56,9 @@ def mock_mongodb():
 @pytest.fixture(autouse=True)
 def mock_llm():
     """Mock Gemini LLM responses"""
-    with patch('genai_crud_agent.app.genai_router.ChatGoogleGenerativeAI') as mock_llm:
+    # get_llm() imports ChatGoogleGenerativeAI on first use; start each test without a client
+    with patch('langchain_google_genai.ChatGoogleGenerativeAI') as mock_llm, \
+            patch('genai_crud_agent.app.genai_router._llm', None):
         mock_response = Mock()
         mock_response.content = '''
         {
@@ -69,7 +73,8 @@ def mock_llm():
 @pytest.fixture
 def mock_db_error():
     """Mock MongoDB error scenarios"""
-    with patch('genai_crud_agent.app.genai_router.MongoClient') as mock_client:
+    with patch('genai_crud_agent.app.db.MongoClient') as mock_client, \
+            patch('genai_crud_agent.app.db._client', None):
         mock_db = Mock()
         mock_db.users.find_one.side_effect = Exception("Database error")
         mock_client.return_value.__getitem__.return_value = mock_db
@@ -0,0 +1,44 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+from genai_crud_agent.app import genai_router as router
+from genai_crud_agent.app.genai_router import get_graph, new_crud_state
+
+OID = "68b97d478273e995d0dcdeed"
+
+def run(text):
+    return asyncio.run(get_graph(use_async=True).ainvoke(new_crud_state(text)))["result"]
+
+def test_async_graph_deletes_by_id(mock_llm, monkeypatch):
+    collection = MagicMock()
+    collection.delete_one = AsyncMock(return_value=MagicMock(deleted_count=1))
+    monkeypatch.setattr(router, "get_async_db", lambda: {"contacts": collection})
+
+    result = run(f"delete contact {OID}")
+
+    collection.delete_one.assert_awaited_once_with({"_id": ObjectId(OID)})
+    assert result == {
+        "success": True, "deleted_count": 1, "action": "delete", "schema": "contacts",
+        "filter_used": {"_id": ObjectId(OID)},
+    }
+
+def test_async_graph_gets_one_by_id(mock_llm, monkeypatch):
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value={"_id": ObjectId(OID), "name": "Nisha"})
+    monkeypatch.setattr(router, "aread_collection", lambda schema: collection)
+    monkeypatch.setattr(router, "RAW_BSON_READS", "off")
+
+    result = run(f"get contact {OID}")
+
+    collection.find_one.assert_awaited_once_with({"_id": ObjectId(OID)})
+    assert result["success"] is True
+    assert result["data"]["name"] == "Nisha"
+
+def test_async_graph_reports_missing_documents(mock_llm, monkeypatch):
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value=None)
+    monkeypatch.setattr(router, "aread_collection", lambda schema: collection)
+
+    result = run(f"get contact {OID}")
+
+    assert result == {"success": False, "error": "Document not found", "action": "get_one", "schema": "contacts"}
@@ -0,0 +1,87 @@
+import asyncio
+import json
+from unittest.mock import MagicMock
+import pytest
+from fastapi import HTTPException
+from genai_crud_agent.app import genai_router as router
+from genai_crud_agent.app import main
+from genai_crud_agent.app.genai_router import apply_batch_plans, build_batch_plan_prompt, new_crud_state
+
+QUERIES = ["show contacts named Nisha", "show every task of job J1"]
+PLANS = [
+    {"index": 1, "action": "get_all", "schema": "contacts", "query": {"name": "Nisha"}},
+    {"index": 2, "action": "get_all", "schema": "tasks", "query": {"job": "J1"}},
+]
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    router.plan_cache.clear()
+    router.plan_templates.table.clear()
+    yield
+    router.plan_cache.clear()
+    router.plan_templates.table.clear()
+
+def response(content):
+    return MagicMock(content=content)
+
+def test_prompt_numbers_every_query():
+    prompt = build_batch_plan_prompt(QUERIES)
+    assert "exactly 2 objects" in prompt and '"index"' in prompt
+    assert "1. show contacts named Nisha" in prompt and "2. show every task of job J1" in prompt
+
+def test_array_is_mapped_back_in_order():
+    states = apply_batch_plans([new_crud_state(text) for text in QUERIES], response(json.dumps(PLANS)))
+
+    assert [(state["schema"], state["query"]) for state in states] == [
+        ("contacts", {"name": "Nisha"}), ("tasks", {"job": "J1"}),
+    ]
+    assert all(state["error"] is None for state in states)
+    assert "index" not in states[0]
+
+def test_batched_plans_are_not_cached():
+    apply_batch_plans([new_crud_state(text) for text in QUERIES], response(json.dumps(PLANS)))
+
+    assert router.plan_cache.get(QUERIES[0]) is None
+    assert router.plan_cache.stats()["size"] == 0
+
+def test_single_plan_is_still_cached():
+    plan = {"action": "get_all", "schema": "contacts", "query": {"name": "Nisha"}}
+    apply_batch_plans([new_crud_state(QUERIES[0])], response(json.dumps(plan)))
+
+    assert router.plan_cache.get(QUERIES[0])["query"] == {"name": "Nisha"}
+
+def test_reordered_plans_are_not_applied():
+    content = json.dumps([PLANS[1], PLANS[0]])
+    states = apply_batch_plans([new_crud_state(text) for text in QUERIES], response(content))
+
+    for index, state in enumerate(states, 1):
+        assert state["error"].startswith(f"Gemini parsing failed: Plan does not echo query index {index}")
+    assert [state["schema"] for state in states] == ["contacts", "tasks"]
+
+@pytest.mark.parametrize("content", [
+    json.dumps(PLANS[:1]),
+    "not json at all",
+])
+def test_unusable_array_falls_back_for_every_item(content):
+    states = apply_batch_plans([new_crud_state(text) for text in QUERIES], response(content))
+
+    for state in states:
+        assert state["error"].startswith("Gemini parsing failed")
+        assert state["action"] in router.READ_ACTIONS and state["result"] is None
+    assert [state["schema"] for state in states] == ["contacts", "tasks"]
+
+def test_malformed_item_falls_back_on_its_own():
+    content = json.dumps([PLANS[0], "get_all tasks"])
+    first, second = apply_batch_plans([new_crud_state(text) for text in QUERIES], response(content))
+
+    assert first["error"] is None and first["query"] == {"name": "Nisha"}
+    assert second["error"].startswith("Gemini parsing failed: Plan is not a JSON object")
+
+def test_query_batch_rejects_too_many_queries(monkeypatch):
+    monkeypatch.setattr(main, "QUERY_BATCH_MAX", 2)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(main.query_batch(main.BatchQueryRequest(queries=QUERIES + ["show users"])))
+
+    assert raised.value.status_code == 400
+    assert raised.value.detail == "At most 2 queries per batch"
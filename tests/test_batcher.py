@@ -0,0 +1,37 @@
+import asyncio
+from genai_crud_agent.app.batcher import MicroBatcher
+
+def test_results_are_routed_back_in_order():
+    batches = []
+
+    async def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(double, max_batch_size=4, max_wait_ms=5)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+    assert asyncio.run(run()) == [i * 2 for i in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+def test_single_request_flushes_after_wait():
+    async def echo(items):
+        return items
+
+    async def run():
+        batcher = MicroBatcher(echo, max_batch_size=8, max_wait_ms=1)
+        return await asyncio.wait_for(batcher.submit("x"), timeout=1)
+
+    assert asyncio.run(run()) == "x"
+
+def test_batch_failure_reaches_every_caller():
+    async def fail(items):
+        raise RuntimeError("rate limited")
+
+    async def run():
+        batcher = MicroBatcher(fail, max_batch_size=2, max_wait_ms=1)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,26 @@
+import asyncio
+from unittest.mock import patch
+from genai_crud_agent.app import db
+
+def test_client_options():
+    with patch.object(db, "MONGO_COMPRESSORS", "zstd, zlib"), patch.object(db, "MONGO_SOCKET_TIMEOUT_MS", 0):
+        options = db.client_options()
+    assert options["compressors"] == ["zstd", "zlib"]
+    assert "zlibCompressionLevel" in options
+    assert options["socketTimeoutMS"] is None
+    assert options["maxPoolSize"] == db.MONGO_MAX_POOL_SIZE
+
+def test_clients_are_shared_and_closed():
+    with patch.object(db, "_client", None), patch.object(db, "_async_client", None):
+        client = db.get_client()
+        assert db.get_client() is client
+        # MongoClient is mocked by conftest: one client, built with the pool options
+        db.MongoClient.assert_called_once_with(db.MONGODB_URI, **db.client_options())
+        async_client = db.get_async_client()
+        assert db.get_async_client() is async_client
+
+        asyncio.run(db.close())
+        assert db._client is None and db._async_client is None
+        db.get_client()
+        assert db.MongoClient.call_count == 2
+        asyncio.run(db.close())
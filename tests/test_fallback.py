@@ -0,0 +1,55 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from genai_crud_agent.app import genai_router as router
+from genai_crud_agent.app.genai_router import get_graph, new_crud_state
+
+WRITES = ("insert_one", "insert_many", "update_one", "update_many", "replace_one",
+          "delete_one", "delete_many", "find_one_and_update", "bulk_write")
+
+@pytest.fixture
+def failing_llm(mock_llm, monkeypatch):
+    monkeypatch.setattr(router, "RULE_PLANNER_THRESHOLD", 0.9)
+    router.plan_cache.clear()
+    router.plan_templates.table.clear()
+    error = RuntimeError("429 Resource has been exhausted")
+    mock_llm.return_value.invoke.side_effect = error
+    mock_llm.return_value.ainvoke = AsyncMock(side_effect=error)
+    return mock_llm
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = MagicMock()
+    database = MagicMock()
+    database.__getitem__.return_value = collection
+    monkeypatch.setattr(router, "get_db", lambda: database)
+    return collection
+
+@pytest.mark.parametrize("text", [
+    "delete contact Nisha",
+    "delete all contacts except user admin",
+    "remove user 68b97d478273e995d0dcdeed from role 68b97d478273e995d0dcdeee",
+    "change contact Nisha message to hello",
+    "create contact with name John",
+])
+def test_llm_failure_never_runs_a_guessed_write(failing_llm, collection, text):
+    result = get_graph().invoke(new_crud_state(text))["result"]
+
+    for method in WRITES:
+        getattr(collection, method).assert_not_called()
+    assert result["success"] is False
+    assert "429 Resource has been exhausted" in result["error"]
+
+def test_llm_failure_still_runs_a_guessed_read(failing_llm, collection):
+    collection.find.return_value = []
+    result = get_graph().invoke(new_crud_state("show me the user called alpha"))["result"]
+    assert collection.find.called or collection.find_one.called
+    assert result["action"] in ("get_one", "get_all")
+
+def test_async_llm_failure_never_runs_a_guessed_write(failing_llm, monkeypatch):
+    collection = MagicMock()
+    monkeypatch.setattr(router, "plan_batcher", None)
+    monkeypatch.setattr(router, "get_async_db", lambda: {"contacts": collection})
+    result = asyncio.run(get_graph(use_async=True).ainvoke(new_crud_state("delete contact Nisha")))["result"]
+    collection.delete_one.assert_not_called()
+    assert result["success"] is False
@@ -0,0 +1,49 @@
+import asyncio
+from unittest.mock import MagicMock
+from bson import ObjectId
+from genai_crud_agent.app import genai_router as router
+from genai_crud_agent.app.genai_router import aget_all_items, get_all_items, new_crud_state
+
+def test_get_all_pushes_find_options_to_mongo(monkeypatch):
+    collection = MagicMock()
+    collection.find.return_value = [{"_id": ObjectId(), "name": "A", "email": "a@example.com"}]
+    monkeypatch.setattr(router, "get_db", lambda: {"contacts": collection})
+    state = new_crud_state("top 5 newest contacts, name and email only")
+    state.update(action="get_all", schema="contacts", query={}, projection=["name", "email"],
+                 sort=[["createdAt", -1]], limit=5)
+
+    result = get_all_items(state)["result"]
+
+    collection.find.assert_called_once_with(
+        {}, projection={"name": 1, "email": 1}, sort=[("createdAt", -1)], limit=5
+    )
+    assert result["success"] is True and result["count"] == 1
+
+def test_get_all_rejects_unknown_fields(monkeypatch):
+    collection = MagicMock()
+    monkeypatch.setattr(router, "get_db", lambda: {"contacts": collection})
+    state = new_crud_state("contacts sorted by password")
+    state.update(action="get_all", schema="contacts", query={}, sort=[["password", 1]])
+
+    result = get_all_items(state)["result"]
+
+    collection.find.assert_not_called()
+    assert result["success"] is False and "Unknown fields: password" in result["error"]
+
+def test_streamed_get_all_skips_the_page_cap(monkeypatch):
+    collection = MagicMock()
+    monkeypatch.setattr(router, "aread_collection", lambda schema: collection)
+    monkeypatch.setattr(router, "GET_ALL_MAX_LIMIT", 10)
+
+    def stream(**plan):
+        state = new_crud_state("every contact")
+        state.update(action="get_all", schema="contacts", query={}, stream=True, **plan)
+        return asyncio.run(aget_all_items(state))["result"]
+
+    result = stream()
+    collection.find.assert_called_once_with({})
+    assert result["cursor"] is collection.find.return_value.batch_size.return_value
+
+    collection.find.reset_mock()
+    stream(limit=5000)
+    collection.find.assert_called_once_with({}, limit=5000)
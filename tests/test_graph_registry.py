@@ -0,0 +1,19 @@
+from genai_crud_agent.app import genai_router as router
+from genai_crud_agent.app.genai_router import get_graph, process_queries
+
+def test_compiled_graphs_are_reused_per_configuration():
+    assert get_graph() is get_graph()
+    assert get_graph(use_async=True) is get_graph(use_async=True)
+    assert get_graph() is not get_graph(use_async=True)
+
+def test_process_queries_plans_misses_with_one_llm_call(mock_llm, monkeypatch):
+    monkeypatch.setattr(router, "RULE_PLANNER_THRESHOLD", 2.0)  # force the LLM tier
+    router.plan_cache.clear()
+    router.plan_templates.table.clear()
+    inputs = ["show me the user called alpha", "show me the user called beta"]
+
+    results = process_queries(inputs)
+
+    assert len(results) == 2
+    assert mock_llm.return_value.invoke.call_count == 1
+    assert all("success" in result for result in results)
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import zstandard
+from genai_crud_agent.app.history import HistorySink, JsonlHistoryBackend, build_history_entry
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_jsonl_append(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    backend = JsonlHistoryBackend(path)
+    backend.write_batch([{"action": "get_all"}])
+    backend.write_batch([{"action": "delete"}])
+    assert read_lines(path) == [{"action": "get_all"}, {"action": "delete"}]
+
+def test_jsonl_rotation_with_compression(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    backend = JsonlHistoryBackend(path, max_bytes=64, compress=True)
+    for i in range(10):
+        backend.write_batch([{"action": "insert", "n": i}])
+    asyncio.run(backend.close())
+
+    segments = sorted(name for name in os.listdir(tmp_path) if name.endswith(".jsonl.zst"))
+    assert segments
+    restored = []
+    for name in segments:
+        with open(tmp_path / name, "rb") as f:
+            data = zstandard.ZstdDecompressor().stream_reader(f).read()
+        restored += [json.loads(line) for line in data.splitlines()]
+    restored += read_lines(path)
+    assert [entry["n"] for entry in restored] == list(range(10))
+
+def test_sink_flushes_on_stop(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+
+    async def run():
+        sink = HistorySink(JsonlHistoryBackend(path), batch_size=8)
+        await sink.start()
+        for i in range(100):
+            sink.record({"n": i})
+        await sink.stop()
+
+    asyncio.run(run())
+    assert [entry["n"] for entry in read_lines(path)] == list(range(100))
+
+def test_sink_drops_when_full(tmp_path):
+    async def run():
+        sink = HistorySink(JsonlHistoryBackend(str(tmp_path / "h.jsonl")), queue_size=2)
+        await sink.start()
+        for i in range(5):
+            sink.record({"n": i})
+        await sink.stop()
+        return sink.dropped
+
+    assert asyncio.run(run()) == 3
+
+GET_ALL_RESULT = {
+    "success": True,
+    "data": [{"_id": f"id{i}", "name": f"n{i}"} for i in range(5)],
+    "count": 5,
+    "action": "get_all",
+    "schema": "contacts",
+    "query": "list all contacts",
+    "timestamp": "2025-09-04T11:52:04.704245Z",
+}
+
+def test_entry_full_keeps_result():
+    assert build_history_entry(GET_ALL_RESULT, "full") is GET_ALL_RESULT
+
+def test_entry_digest():
+    entry = build_history_entry(GET_ALL_RESULT, "digest", filter_={"name": "x"})
+    assert "data" not in entry
+    assert entry["ids"] == [f"id{i}" for i in range(5)]
+    assert entry["count"] == 5
+    assert entry["filter"] == {"name": "x"}
+    assert entry["query"] == "list all contacts"
+    assert entry["payload_hash"] == build_history_entry(dict(GET_ALL_RESULT), "digest")["payload_hash"]
+
+def test_entry_ids_only_is_bounded():
+    entry = build_history_entry(GET_ALL_RESULT, "ids", max_ids=2)
+    assert entry["ids"] == ["id0", "id1"]
+    assert entry["ids_truncated"] is True
+    assert "payload_hash" not in entry
+
+def test_entry_digest_for_writes():
+    result = {"success": True, "deleted_count": 1, "action": "delete", "schema": "contacts",
+              "filter_used": {"_id": "68b97d478273e995d0dcdeed"}}
+    entry = build_history_entry(result, "digest")
+    assert entry["count"] == 1
+    assert entry["filter"] == {"_id": "68b97d478273e995d0dcdeed"}
+
+    bulk = {"success": True, "inserted_ids": ["a1", "a2"], "action": "insert", "schema": "contacts"}
+    assert build_history_entry(bulk, "digest")["ids"] == ["a1", "a2"]
+    assert build_history_entry(bulk, "ids")["ids"] == ["a1", "a2"]
+
+    upsert = {"success": True, "action": "patch", "schema": "tasks", "updated_fields": ["status"],
+              "filter_used": {"job": "J1"}, "matched_count": 0, "modified_count": 0, "upserted_id": "b1"}
+    assert build_history_entry(upsert, "digest")["ids"] == ["b1"]
+
+def make_entry(i):
+    return {
+        "timestamp": f"2025-09-04T11:52:{i:02d}.000000Z",
+        "action": "delete" if i % 2 else "insert",
+        "schema": "contacts" if i % 3 else "users",
+        "success": i % 5 != 0,
+        "n": i,
+    }
+
+def test_query_filters_and_pages_across_segments(tmp_path):
+    backend = JsonlHistoryBackend(str(tmp_path / "history.jsonl"), max_bytes=400, compress=True)
+    for i in range(40):
+        backend.write_batch([make_entry(i)])
+    assert len(backend.segments()) > 2
+
+    page = backend.query_sync(limit=5)
+    assert [e["n"] for e in page["entries"]] == [39, 38, 37, 36, 35]
+    assert page["next_offset"] == 5
+
+    deletes = backend.query_sync(action="delete", schema="contacts", limit=100)
+    expected = [i for i in reversed(range(40)) if i % 2 and i % 3]
+    assert [e["n"] for e in deletes["entries"]] == expected
+    assert deletes["next_offset"] is None
+
+    failed = backend.query_sync(success=False, limit=100)
+    assert [e["n"] for e in failed["entries"]] == [35, 30, 25, 20, 15, 10, 5, 0]
+
+    window = backend.query_sync(since="2025-09-04T11:52:10Z", until="2025-09-04T11:52:12Z")
+    assert [e["n"] for e in window["entries"]] == [12, 11, 10]
+
+    second = backend.query_sync(offset=5, limit=5)
+    assert [e["n"] for e in second["entries"]] == [34, 33, 32, 31, 30]
+
+def test_query_indexes_legacy_log(tmp_path):
+    path = tmp_path / "history.jsonl"
+    path.write_text("".join(json.dumps(make_entry(i)) + "\n" for i in range(3)))
+    backend = JsonlHistoryBackend(str(path))
+    assert [e["n"] for e in backend.query_sync()["entries"]] == [2, 1, 0]
+    backend.write_batch([make_entry(3)])
+    assert [e["n"] for e in backend.query_sync()["entries"]] == [3, 2, 1, 0]
@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+LAZY_MODULES = ("langchain_google_genai", "langgraph", "genai_crud_agent.app.schemas.all_schemas")
+
+def test_importing_main_does_not_build_llm_graph_or_schemas():
+    code = (
+        "import sys, genai_crud_agent.app.main\n"
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path), LANGSMITH_TRACING="false")
+    proc = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == ""
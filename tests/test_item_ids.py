@@ -0,0 +1,44 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+from genai_crud_agent.app import genai_router as router
+from genai_crud_agent.app.genai_router import aget_all_items, get_one_item, new_crud_state
+
+FIRST, SECOND, MISSING = (str(ObjectId()) for _ in range(3))
+
+def ids_state(action="get_one"):
+    state = new_crud_state("get contacts")
+    state.update(action=action, schema="contacts", item_ids=[SECOND, MISSING, FIRST])
+    return state
+
+def test_one_in_query_keeps_input_order_and_reports_missing(monkeypatch):
+    collection = MagicMock()
+    # The server returns documents in its own order
+    collection.find.return_value = [{"_id": ObjectId(FIRST), "name": "A"}, {"_id": ObjectId(SECOND), "name": "B"}]
+    monkeypatch.setattr(router, "get_db", lambda: {"contacts": collection})
+
+    result = get_one_item(ids_state())["result"]
+
+    collection.find.assert_called_once_with({"_id": {"$in": [ObjectId(SECOND), ObjectId(MISSING), ObjectId(FIRST)]}})
+    collection.find_one.assert_not_called()
+    assert [doc["_id"] for doc in result["data"]] == [SECOND, FIRST]
+    assert result["missing_ids"] == [MISSING]
+    assert result["success"] is True and result["count"] == 2
+
+def test_async_lookup_with_nothing_found(monkeypatch):
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=[])
+    collection = MagicMock()
+    collection.find.return_value = cursor
+    monkeypatch.setattr(router, "aread_collection", lambda schema: collection)
+
+    result = asyncio.run(aget_all_items(ids_state("get_all")))["result"]
+
+    assert result["success"] is False
+    assert result["missing_ids"] == [SECOND, MISSING, FIRST]
+
+def test_invalid_id_fails_the_lookup(monkeypatch):
+    state = ids_state()
+    state["item_ids"] = ["not-an-id"]
+    result = get_one_item(state)["result"]
+    assert result["success"] is False and result["error"].startswith("Get one failed")
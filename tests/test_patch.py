@@ -0,0 +1,78 @@
+from unittest.mock import MagicMock
+from bson import ObjectId
+from genai_crud_agent.app import genai_router as router
+from genai_crud_agent.app.genai_router import new_crud_state, patch_item
+
+OID = "68b97d478273e995d0dcdeed"
+
+def patch_state(**extra):
+    state = new_crud_state(f"patch task {OID} status: done")
+    state.update(action="patch", schema="tasks", item_id=OID, item={"status": "done", "unknown": 1}, **extra)
+    return state
+
+def mock_database(monkeypatch):
+    database = MagicMock()
+    monkeypatch.setattr(router, "get_db", lambda: database)
+    return database["tasks"]
+
+def test_patch_is_one_update_without_reading_the_document(monkeypatch):
+    collection = mock_database(monkeypatch)
+    collection.update_one.return_value = MagicMock(matched_count=1, modified_count=1, upserted_id=None)
+
+    result = patch_item(patch_state())["result"]
+
+    collection.find_one.assert_not_called()
+    collection.update_one.assert_called_once_with({"_id": ObjectId(OID)}, {"$set": {"status": "done"}}, upsert=False)
+    assert result["success"] is True
+    assert result["matched_count"] == 1 and result["updated_fields"] == ["status"]
+
+def test_patch_reports_missing_document(monkeypatch):
+    collection = mock_database(monkeypatch)
+    collection.update_one.return_value = MagicMock(matched_count=0, modified_count=0, upserted_id=None)
+
+    result = patch_item(patch_state())["result"]
+
+    assert result["success"] is False
+    assert "Document not found" in result["error"]
+
+def test_patch_upsert(monkeypatch):
+    collection = mock_database(monkeypatch)
+    upserted = ObjectId()
+    collection.update_one.return_value = MagicMock(matched_count=0, modified_count=0, upserted_id=upserted)
+
+    result = patch_item(patch_state(upsert=True))["result"]
+
+    assert collection.update_one.call_args.kwargs["upsert"] is True
+    assert result["success"] is True and result["upserted_id"] == str(upserted)
+
+def test_patch_upsert_validates_the_document_it_would_insert(monkeypatch):
+    collection = mock_database(monkeypatch)
+    state = new_crud_state("upsert contact Nisha message hello")
+    state.update(action="patch", schema="contacts", query={"name": "Nisha", "email": {"$exists": True}},
+                 item={"message": "hello"}, upsert=True)
+
+    result = patch_item(state)["result"]
+
+    collection.update_one.assert_not_called()
+    assert result["success"] is False
+    assert result["error"].startswith("Validation error:") and "createdAt" in result["error"]
+
+def test_patch_returns_post_image(monkeypatch):
+    collection = mock_database(monkeypatch)
+    collection.find_one_and_update.return_value = {"_id": ObjectId(OID), "status": "done"}
+
+    result = patch_item(patch_state(return_document=True))["result"]
+
+    collection.update_one.assert_not_called()
+    assert collection.find_one_and_update.call_args.kwargs["return_document"] is router.ReturnDocument.AFTER
+    assert result["data"] == {"_id": OID, "status": "done"}
+
+def test_patch_rejects_invalid_field_without_writing(monkeypatch):
+    collection = mock_database(monkeypatch)
+    state = patch_state()
+    state["item"] = {"status": ["not", "a", "string"]}
+
+    result = patch_item(state)["result"]
+
+    collection.update_one.assert_not_called()
+    assert result["success"] is False and "status" in result["error"]
@@ -0,0 +1,54 @@
+import time
+from genai_crud_agent.app.plan_cache import PlanCache, normalize_input
+
+PLAN = {"action": "get_all", "schema": "users", "query": {}}
+
+def test_normalize_input():
+    assert normalize_input("  get   all\tusers \n") == "get all users"
+    assert PlanCache.make_key("get all users") == PlanCache.make_key(" get  all users ")
+
+def test_hit_and_miss_counters():
+    cache = PlanCache(maxsize=10)
+    assert cache.get("get all users") is None
+    cache.put("get all users", PLAN)
+    assert cache.get("get all users") == PLAN
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_returns_copies():
+    cache = PlanCache(maxsize=10)
+    cache.put("get all users", PLAN)
+    cache.get("get all users")["query"]["name"] = "x"
+    assert cache.get("get all users") == PLAN
+
+def test_lru_eviction():
+    cache = PlanCache(maxsize=2)
+    cache.put("a", PLAN)
+    cache.put("b", PLAN)
+    cache.get("a")
+    cache.put("c", PLAN)
+    assert cache.get("b") is None
+    assert cache.get("a") == PLAN
+    assert cache.get("c") == PLAN
+
+def test_ttl_expiry(monkeypatch):
+    cache = PlanCache(maxsize=10, ttl=1)
+    cache.put("a", PLAN)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 5)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "plan_cache.json")
+    cache = PlanCache(maxsize=10, path=path)
+    cache.put("get all users", PLAN)
+    cache.save()
+
+    warm = PlanCache(maxsize=10, path=path)
+    assert warm.load() == 1
+    assert warm.get("get all users") == PLAN
+
+def test_load_missing_file(tmp_path):
+    cache = PlanCache(path=str(tmp_path / "missing.json"))
+    assert cache.load() == 0
@@ -0,0 +1,78 @@
+from genai_crud_agent.app import genai_router as router
+from genai_crud_agent.app.plan_templates import PlanTemplates, mask_input, learn_template
+
+OID_A = "68b97d478273e995d0dcdeed"
+OID_B = "68b97c5efae5a92a5aaadb0a"
+
+def test_mask_input():
+    shape, slots = mask_input(f"delete contact id {OID_A}")
+    assert shape == "delete contact id <oid0>"
+    assert slots == [("oid", OID_A)]
+
+    shape, slots = mask_input('get user with email john@example.com and name "John Doe" age 30')
+    assert shape == "get user with email <email0> and name <quoted1> age <num2>"
+    assert slots == [("email", "john@example.com"), ("quoted", "John Doe"), ("num", "30")]
+
+def test_template_roundtrip():
+    templates = PlanTemplates()
+    plan = {"action": "delete", "schema": "contacts", "item_id": OID_A, "item": None, "query": {}}
+    assert templates.learn(f"delete contact id {OID_A}", plan)
+
+    filled = templates.lookup(f"delete contact id {OID_B}")
+    assert filled == {**plan, "item_id": OID_B}
+
+def test_template_fills_substrings_and_numbers():
+    templates = PlanTemplates()
+    plan = {
+        "action": "get_all",
+        "schema": "users",
+        "query": {"email": {"$regex": "^john@example.com$"}, "creditLimit": 30},
+    }
+    assert templates.learn("get users with email john@example.com limit 30", plan)
+
+    filled = templates.lookup("get users with email ann@example.org limit 45")
+    assert filled["query"] == {"email": {"$regex": "^ann@example.org$"}, "creditLimit": 45}
+
+def test_projection_and_sort_numbers_stay_literal():
+    templates = PlanTemplates()
+    plan = {
+        "action": "get_all", "schema": "contacts", "query": {},
+        "projection": {"name": 1, "email": 1}, "sort": [["createdAt", 1]], "limit": 1,
+    }
+    assert templates.learn("show the 1 oldest contacts, name and email only", plan)
+
+    filled = templates.lookup("show the 5 oldest contacts, name and email only")
+    assert filled["projection"] == {"name": 1, "email": 1}
+    assert filled["sort"] == [["createdAt", 1]]
+    assert filled["limit"] == 5
+
+def test_action_and_schema_are_never_slots():
+    templates = PlanTemplates()
+    plan = {"action": "get_all", "schema": "users", "query": {}}
+    assert not templates.learn('get all "users"', plan)
+    assert templates.lookup('get all "admins; drop"') is None
+
+def test_decimal_fills_a_template_learned_from_an_integer():
+    templates = PlanTemplates()
+    plan = {"action": "patch", "schema": "tasks", "item_id": OID_A, "item": {"priority": 3}}
+    assert templates.learn(f"patch task {OID_A} set priority to 3", plan)
+
+    filled = templates.lookup(f"patch task {OID_B} set priority to 3.75")
+    assert filled["item"] == {"priority": 3.75}
+
+def test_router_drops_templates_for_unknown_schemas(monkeypatch):
+    templates = PlanTemplates()
+    shape, _ = mask_input(f"delete contact id {OID_A}")
+    templates.table.put(shape, {"action": "delete", "schema": "admins; drop", "item_id": {"$slot": 0}})
+    monkeypatch.setattr(router, "plan_templates", templates)
+
+    assert router.template_plan(f"delete contact id {OID_B}") is None
+
+def test_unused_slot_is_not_learned():
+    plan = {"action": "get_all", "schema": "users", "query": {}}
+    assert learn_template([("oid", OID_A)], plan) is None
+
+def test_unknown_shape_misses():
+    templates = PlanTemplates()
+    assert templates.lookup(f"delete contact id {OID_A}") is None
+    assert templates.lookup("get all users") is None
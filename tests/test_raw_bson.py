@@ -0,0 +1,33 @@
+import bson
+import orjson
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from genai_crud_agent.app.raw_bson import (
+    ExtendedJSONDocument, raw_codec_options, is_raw, document_id,
+)
+from genai_crud_agent.app.serializers import dumps
+
+OID = ObjectId("507f1f77bcf86cd799439011")
+DOC = {"_id": OID, "name": "John Doe", "owner": {"_id": OID}, "tags": ["a", "b"]}
+
+def test_raw_documents_serialize_like_decoded_ones():
+    raw = RawBSONDocument(bson.encode(DOC))
+    assert dumps({"data": [raw]}) == dumps({"data": [DOC]})
+
+def test_extended_json_falls_back_without_bsonjs(monkeypatch):
+    from genai_crud_agent.app import raw_bson
+    monkeypatch.setattr(raw_bson, "bsonjs", None)
+    raw = ExtendedJSONDocument(bson.encode(DOC))
+    assert orjson.loads(dumps(raw))["_id"] == str(OID)
+
+def test_codec_options_decode_batches_to_raw_documents():
+    batch = bson.encode(DOC) * 3
+    docs = bson.decode_all(batch, raw_codec_options())
+    assert is_raw(docs) and not is_raw([DOC]) and not is_raw([])
+    assert type(bson.decode_all(batch, raw_codec_options(extended_json=True))[0]) is ExtendedJSONDocument
+
+def test_document_id():
+    assert document_id(RawBSONDocument(bson.encode(DOC))) == OID
+    # _id not stored first: falls back to decoding
+    assert document_id(RawBSONDocument(bson.encode({"name": "x", "_id": 7}))) == 7
+    assert document_id(DOC) == OID
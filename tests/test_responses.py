@@ -0,0 +1,49 @@
+import asyncio
+import json
+from bson import ObjectId
+from genai_crud_agent.app import responses
+from genai_crud_agent.app.responses import wants_ndjson, iter_ndjson, aiter_ndjson
+
+def test_wants_ndjson():
+    assert wants_ndjson(None, stream=True)
+    assert wants_ndjson("application/x-ndjson")
+    assert wants_ndjson("application/ndjson, */*;q=0.1")
+    assert not wants_ndjson("application/json")
+    assert not wants_ndjson(None)
+
+def test_iter_ndjson_serializes_each_document():
+    docs = [{"_id": ObjectId(), "name": f"user {i}"} for i in range(3)]
+    seen = []
+    body = b"".join(iter_ndjson(iter(docs), on_document=seen.append))
+    lines = body.decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"_id": str(doc["_id"]), "name": doc["name"]} for doc in docs
+    ]
+    assert seen == docs
+
+def test_iter_ndjson_chunks_large_results(monkeypatch):
+    monkeypatch.setattr(responses, "NDJSON_CHUNK_BYTES", 64)
+    docs = [{"n": i, "pad": "x" * 40} for i in range(10)]
+    chunks = list(iter_ndjson(docs))
+    assert len(chunks) > 1
+    assert all(chunk.endswith(b"\n") for chunk in chunks)
+    assert b"".join(chunks).count(b"\n") == 10
+
+def test_aiter_ndjson_matches_sync():
+    docs = [{"n": i} for i in range(5)]
+
+    async def cursor():
+        for doc in docs:
+            yield doc
+
+    async def collect():
+        return b"".join([chunk async for chunk in aiter_ndjson(cursor())])
+
+    assert asyncio.run(collect()) == b"".join(iter_ndjson(docs))
+
+def test_negotiated_response():
+    from genai_crud_agent.app.responses import negotiated_response
+    content = {"_id": ObjectId("507f1f77bcf86cd799439011")}
+    assert negotiated_response(content, "application/msgpack").media_type == "application/msgpack"
+    assert negotiated_response(content, "application/json").media_type == "application/json"
+    assert negotiated_response(content, None).body == b'{"_id":"507f1f77bcf86cd799439011"}'
@@ -0,0 +1,113 @@
+import pytest
+from bson import ObjectId
+from genai_crud_agent.app.rule_planner import RulePlanner, extract_query_filters, parse_field_values, scan
+from genai_crud_agent.app.schemas.all_schemas import ContactsSchema, TasksSchema, UsersSchema
+
+OID = "68b97d478273e995d0dcdeed"
+
+@pytest.fixture
+def planner():
+    return RulePlanner({
+        "contacts": ContactsSchema.model_fields,
+        "tasks": TasksSchema.model_fields,
+        "users": UsersSchema.model_fields,
+    })
+
+@pytest.mark.parametrize("query,action,schema", [
+    (f"delete contact id {OID}", "delete", "contacts"),
+    (f"get user with id {OID}", "get_one", "users"),
+    ("get all users", "get_all", "users"),
+    ("list all tasks", "get_all", "tasks"),
+    (f"patch task {OID} status: done", "patch", "tasks"),
+    ("update contact message to new york", "patch", "contacts"),
+])
+def test_detects_action_and_schema(planner, query, action, schema):
+    plan, _ = planner.plan(query)
+    assert plan["action"] == action
+    assert plan["schema"] == schema
+
+@pytest.mark.parametrize("query", ["get all users", "list all tasks", "show me all the contacts"])
+def test_plain_listing_is_confident(planner, query):
+    plan, confidence = planner.plan(query)
+    assert plan["query"] == {}
+    assert confidence == 1.0
+
+def test_id_targeted_plan_is_confident(planner):
+    plan, confidence = planner.plan(f"delete contact id {OID}")
+    assert plan["item_id"] == OID
+    assert plan["query"] == {}
+    assert confidence == 1.0
+
+def test_patch_fields(planner):
+    plan, confidence = planner.plan(f"patch task {OID} status: done")
+    assert plan["item"] == {"status": "done"}
+    assert confidence == 1.0
+
+@pytest.mark.parametrize("query", [
+    "list all",
+    "show everything",
+    "delete contact whose name is Nisha",
+    "create contact with name John and email john@example.com",
+    "change contact Nisha message to hello",
+    "get all users where age > 30",
+    "get all contacts created after 2024-01-01",
+    "get all users except John",
+    "list the 5 newest contacts",
+    f"do not delete contact {OID}",
+    f"do not remove task {OID}",
+    f"don't delete task {OID}",
+    f"delete task {OID}?? no wait, get it",
+    f"delete contact {OID} if status is active",
+    f"delete contact {OID} unless it is active",
+    f"set task {OID} status to done for all tasks",
+    "show all tasks with status done and priority high",
+    "get all tasks sorted by title",
+])
+def test_ambiguous_input_is_not_confident(planner, query):
+    _, confidence = planner.plan(query)
+    assert confidence < 0.9
+
+@pytest.mark.parametrize("text,expected", [
+    ("create user with name John and email john@example.com", {"name": "John", "email": "john@example.com"}),
+    ("set status to active", {"status": "active"}),
+    ("name: Alice, email = alice@example.com", {"name": "Alice", "email": "alice@example.com"}),
+    (f"update user {OID} set name to Jacob email to jacob@example.com", {"name": "Jacob", "email": "jacob@example.com"}),
+    ("set title to go to market, count: 3", {"title": "go to market", "count": 3}),
+])
+def test_parse_field_values(text, expected):
+    assert parse_field_values(text) == expected
+
+@pytest.mark.parametrize("text,expected", [
+    ("get user with email john@example.com", {"email": "john@example.com"}),
+    ("find contact Nisha", {"name": {"$regex": "Nisha", "$options": "i"}}),
+    ('get contacts whose status is active and name is "Bob"',
+     {"status": "active", "name": {"$regex": "Bob", "$options": "i"}}),
+    (f"delete contact id {OID}", {"_id": ObjectId(OID)}),
+])
+def test_extract_query_filters(text, expected):
+    assert extract_query_filters(text) == expected
+
+def test_scan_collects_ids_and_emails():
+    scanned = scan(f"update user {OID.upper()} email to jo@example.com")
+    assert scanned.object_ids == [OID]
+    assert scanned.emails == ["jo@example.com"]
+    assert scanned.fields == {"email": "jo@example.com"}
+
+def test_set_based_writes(planner):
+    plan, confidence = planner.plan("delete all tasks whose status is done")
+    assert plan["action"] == "delete_many"
+    assert plan["query"] == {"status": "done"}
+    assert plan["preview"] is True
+    assert confidence < 0.9
+
+def test_several_ids_become_one_lookup(planner):
+    other = "68b97d478273e995d0dcdeee"
+    plan, confidence = planner.plan(f"get contacts {other}, {OID}")
+    assert plan["item_ids"] == [other, OID]
+    assert plan["item_id"] is None and plan["query"] == {}
+    assert confidence == 1.0
+
+    plan, confidence = planner.plan(f"delete contacts {other} and {OID}")
+    assert plan["action"] == "delete_many"
+    assert plan["query"] == {"_id": {"$in": [ObjectId(other), ObjectId(OID)]}}
+    assert confidence < 0.9
@@ -0,0 +1,43 @@
+from datetime import datetime
+from decimal import Decimal
+import orjson
+from bson import Decimal128, ObjectId
+from genai_crud_agent.app.serializers import dumps, serialize_mongodb_doc, MongoJSONResponse
+
+OID = ObjectId("507f1f77bcf86cd799439011")
+
+def test_serialize_mongodb_doc_converts_bson_types():
+    doc = {
+        "_id": OID,
+        "owner": {"_id": OID, "tags": ["a", OID]},
+        "createdAt": datetime(2024, 1, 2, 3, 4, 5, 600000),
+        "price": Decimal128("19.99"),
+        "count": Decimal("3"),
+    }
+    assert serialize_mongodb_doc(doc) == {
+        "_id": "507f1f77bcf86cd799439011",
+        "owner": {"_id": "507f1f77bcf86cd799439011", "tags": ["a", "507f1f77bcf86cd799439011"]},
+        "createdAt": "2024-01-02T03:04:05.600000",
+        "price": 19.99,
+        "count": 3,
+    }
+
+def test_dumps_is_single_pass_bytes():
+    assert dumps({"_id": OID, "ok": True}) == b'{"_id":"507f1f77bcf86cd799439011","ok":true}'
+
+def test_response_renders_raw_documents():
+    response = MongoJSONResponse({"data": [{"_id": OID}]})
+    assert orjson.loads(response.body) == {"data": [{"_id": "507f1f77bcf86cd799439011"}]}
+    assert response.media_type == "application/json"
+
+def test_packb_handles_bson_types_natively():
+    import ormsgpack
+    from genai_crud_agent.app.serializers import packb
+    created = datetime(2024, 1, 2, 3, 4, 5)
+    packed = packb({"_id": OID, "createdAt": created, "blob": b"\x00\x01"})
+    decoded = ormsgpack.unpackb(packed, ext_hook=lambda code, data: (code, data))
+    assert decoded["_id"] == "507f1f77bcf86cd799439011"
+    assert decoded["blob"] == b"\x00\x01"
+    # msgpack timestamp extension: type -1, 32-bit seconds since the epoch
+    code, data = decoded["createdAt"]
+    assert code == -1 and int.from_bytes(data, "big") == 1704164645
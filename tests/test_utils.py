@@ -0,0 +1,57 @@
+import pytest
+from bson import ObjectId
+from genai_crud_agent.app.utils import encode_cursor, decode_cursor, find_options, parse_projection, parse_sort
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    token = encode_cursor(oid)
+    assert len(token) == 16 and "=" not in token
+    assert decode_cursor(token) == oid
+
+def test_decode_cursor_accepts_hex_object_id():
+    oid = ObjectId()
+    assert decode_cursor(str(oid)) == oid
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_parse_projection():
+    allowed = ["name", "email", "mobile"]
+    assert parse_projection(None, allowed) is None
+    assert parse_projection("name, email", allowed) == {"name": 1, "email": 1}
+    with pytest.raises(ValueError):
+        parse_projection("name,password", allowed)
+
+
+FIELDS = ["name", "email", "createdAt", "address"]
+
+def test_find_options_top_k():
+    plan = {"projection": ["name", "email"], "sort": [["createdAt", -1]], "limit": 5}
+    assert find_options(plan, FIELDS, 100, 1000) == {
+        "projection": {"name": 1, "email": 1},
+        "sort": [("createdAt", -1)],
+        "limit": 5,
+    }
+
+def test_find_options_defaults_and_caps():
+    assert find_options({}, FIELDS, 100, 1000) == {"limit": 100}
+    options = find_options({"limit": 50000, "skip": 20, "hint": "createdAt_-1"}, FIELDS, 100, 1000)
+    assert options == {"limit": 1000, "skip": 20, "hint": "createdAt_-1"}
+
+def test_parse_sort_forms():
+    assert parse_sort({"createdAt": "desc"}, FIELDS) == [("createdAt", -1)]
+    assert parse_sort(["-createdAt", "name"], FIELDS) == [("createdAt", -1), ("name", 1)]
+    assert parse_sort("address.city", FIELDS) == [("address.city", 1)]
+
+@pytest.mark.parametrize("plan", [
+    {"projection": ["password"]},
+    {"sort": [["createdAt", "sideways"]]},
+    {"hint": [["secret", 1]]},
+    {"limit": -1},
+    {"skip": -5},
+    {"projection": {"name": 2}},
+])
+def test_find_options_rejects_invalid_plans(plan):
+    with pytest.raises(ValueError):
+        find_options(plan, FIELDS, 100, 1000)
@@ -0,0 +1,36 @@
+import pytest
+from pydantic import ValidationError
+from genai_crud_agent.app.genai_router import get_schema_map
+from genai_crud_agent.app.validators import SchemaValidators
+
+@pytest.fixture(scope="module")
+def validators():
+    return SchemaValidators(get_schema_map())
+
+def test_registry_covers_every_schema(validators):
+    assert len(validators) == len(get_schema_map()) == 20
+    assert "contacts" in validators
+
+def test_validate_matches_model_dump(validators):
+    item = {"firstName": "Ada", "isActive": True, "unknown": 1}
+    expected = get_schema_map()["users"](**item).model_dump(exclude_unset=True)
+    assert validators.validate("users", item) == expected == {"firstName": "Ada", "isActive": True}
+
+def test_validate_requires_schema_fields(validators):
+    with pytest.raises(ValidationError):
+        validators.validate("contacts", {"name": "Nisha"})
+
+def test_validate_partial_checks_only_given_fields(validators):
+    # Contacts has nine required fields; a patch only carries the ones it changes
+    assert validators.validate_partial("contacts", {"message": "hello", "unknown": 1}) == {"message": "hello"}
+
+def test_validate_partial_reports_field_errors(validators):
+    with pytest.raises(ValidationError) as excinfo:
+        validators.validate_partial("contacts", {"name": 5, "message": "ok"})
+    assert excinfo.value.title == "ContactsSchema"
+    assert [error["loc"] for error in excinfo.value.errors()] == [("name",)]
+
+def test_validate_many(validators):
+    assert validators.validate_many("tasks", [{"status": "done"}, {"job": "j1"}]) == [{"status": "done"}, {"job": "j1"}]
+    with pytest.raises(ValidationError):
+        validators.validate_many("tasks", [{"status": "done"}, {"status": ["not", "a", "string"]}])
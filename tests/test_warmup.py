@@ -0,0 +1,36 @@
+import asyncio
+from genai_crud_agent.app import main
+from genai_crud_agent.app import warmup as warmup_module
+
+def test_warmup_reports_steps_and_keeps_going_after_failures(monkeypatch):
+    async def no_server(count):
+        raise ConnectionError("no server")
+
+    async def catalog():
+        return 3
+
+    compiled = []
+    monkeypatch.setattr(warmup_module, "open_connections", no_server)
+    monkeypatch.setattr(warmup_module, "load_catalog", catalog)
+    report = asyncio.run(warmup_module.warmup(compile_graph=lambda: compiled.append(True), llm=False))
+
+    steps = report["steps"]
+    assert list(steps) == ["mongo_pool", "validators", "collection_catalog", "plan_caches", "graph"]
+    assert steps["mongo_pool"] == {"ok": False, "error": "no server", "ms": steps["mongo_pool"]["ms"]}
+    assert steps["validators"]["ok"] and steps["validators"]["detail"] == 20
+    assert steps["collection_catalog"]["detail"] == 3
+    assert compiled == [True]
+    assert report["ok"] is False
+
+def test_ready_is_503_until_warmup_succeeds(monkeypatch):
+    monkeypatch.setattr(main, "warmup_report", None)
+    assert main.readiness().status_code == 503
+
+    failed = {"ok": False, "steps": {"mongo_pool": {"ok": False, "error": "no server", "ms": 1.0}}}
+    monkeypatch.setattr(main, "warmup_report", failed)
+    response = main.readiness()
+    assert response.status_code == 503
+    assert b'"warmup failed"' in response.body
+
+    monkeypatch.setattr(main, "warmup_report", {"ok": True, "skipped": True})
+    assert main.readiness() == {"ready": True, "warmup": {"ok": True, "skipped": True}}
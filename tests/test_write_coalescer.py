@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+from pymongo.results import DeleteResult, UpdateResult
+from genai_crud_agent.app.write_coalescer import WriteCoalescer
+
+class FakeCollection:
+    def __init__(self):
+        self.bulk_calls = []
+        self.single_calls = []
+
+    async def bulk_write(self, models, ordered=False):
+        self.bulk_calls.append(models)
+
+    async def insert_one(self, document):
+        self.single_calls.append(("insert", document))
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    async def update_one(self, filter_, update, upsert=False):
+        self.single_calls.append(("update", filter_))
+        return UpdateResult({"n": 1, "nModified": 1}, True)
+
+    async def delete_one(self, filter_):
+        self.single_calls.append(("delete", filter_))
+        return DeleteResult({"n": 0}, True)
+
+class FakeDatabase:
+    name = "test_db"
+
+    def __init__(self, wire_version):
+        self.wire_version = wire_version
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    async def command(self, name):
+        return {"maxWireVersion": self.wire_version}
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    async def bulk_write(self, models, ordered=False, verbose_results=False):
+        self.calls.append(models)
+        return SimpleNamespace(
+            insert_results={},
+            update_results={i: UpdateResult({"n": 1, "nModified": 1}, True) for i in range(0, len(models), 2)},
+            delete_results={i: DeleteResult({"n": i}, True) for i in range(1, len(models), 2)},
+        )
+
+def test_concurrent_inserts_share_one_bulk_write():
+    db = FakeDatabase(wire_version=21)
+    coalescer = WriteCoalescer(FakeClient(), db, window_ms=5)
+
+    async def run():
+        contacts = coalescer.collection("contacts")
+        return await asyncio.gather(*(contacts.insert_one({"n": i}) for i in range(10)))
+
+    results = asyncio.run(run())
+    assert len(db["contacts"].bulk_calls) == 1
+    assert len({result.inserted_id for result in results}) == 10
+
+def test_mixed_writes_use_client_bulk_write_on_new_servers():
+    client = FakeClient()
+    coalescer = WriteCoalescer(client, FakeDatabase(wire_version=25), window_ms=5)
+
+    async def run():
+        tasks = coalescer.collection("tasks")
+        return await asyncio.gather(
+            tasks.update_one({"_id": 1}, {"$set": {"status": "done"}}),
+            tasks.delete_one({"_id": 2}),
+            tasks.update_one({"_id": 3}, {"$set": {"status": "done"}}),
+            tasks.delete_one({"_id": 4}),
+        )
+
+    results = asyncio.run(run())
+    assert len(client.calls) == 1
+    assert [r.matched_count for r in results[0::2]] == [1, 1]
+    assert [r.deleted_count for r in results[1::2]] == [1, 3]
+
+def test_mixed_writes_run_individually_on_old_servers():
+    db = FakeDatabase(wire_version=21)
+    client = FakeClient()
+    coalescer = WriteCoalescer(client, db, window_ms=5)
+
+    async def run():
+        tasks = coalescer.collection("tasks")
+        return await asyncio.gather(
+            tasks.update_one({"_id": 1}, {"$set": {"status": "done"}}),
+            tasks.delete_one({"_id": 2}),
+        )
+
+    updated, deleted = asyncio.run(run())
+    assert client.calls == []
+    assert updated.modified_count == 1
+    assert deleted.deleted_count == 0
@@ -0,0 +1,89 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from genai_crud_agent.app import genai_router as router
+from genai_crud_agent.app.genai_router import awrite_many, new_crud_state, write_many
+
+def many_state(action, query, item=None, **extra):
+    state = new_crud_state(f"{action} tasks")
+    state.update(action=action, schema="tasks", query=query, item=item, **extra)
+    return state
+
+def mock_collection(monkeypatch):
+    database = MagicMock()
+    monkeypatch.setattr(router, "get_db", lambda: database)
+    return database["tasks"]
+
+def test_patch_many_is_one_update_many(monkeypatch):
+    collection = mock_collection(monkeypatch)
+    collection.update_many.return_value = MagicMock(matched_count=12, modified_count=10)
+
+    result = write_many(many_state("patch_many", {"job": "J1"}, {"status": "done", "unknown": 1}))["result"]
+
+    collection.update_many.assert_called_once_with({"job": "J1"}, {"$set": {"status": "done"}})
+    assert result == {
+        "success": True, "action": "patch_many", "schema": "tasks", "filter_used": {"job": "J1"},
+        "matched_count": 12, "modified_count": 10,
+    }
+
+def test_preview_counts_without_writing(monkeypatch):
+    collection = mock_collection(monkeypatch)
+    collection.count_documents.return_value = 12
+
+    result = write_many(many_state("delete_many", {"job": "J1"}, preview=True))["result"]
+
+    collection.count_documents.assert_called_once_with({"job": "J1"})
+    collection.delete_many.assert_not_called()
+    assert result["preview"] is True and result["matched_count"] == 12
+
+def test_delete_many_refuses_an_empty_filter(monkeypatch):
+    collection = mock_collection(monkeypatch)
+
+    result = write_many(many_state("delete_many", {}))["result"]
+
+    collection.delete_many.assert_not_called()
+    assert result["success"] is False
+    assert result["error"].startswith("Delete many failed: Refusing")
+
+def test_async_delete_many(monkeypatch):
+    collection = MagicMock()
+    collection.delete_many = AsyncMock(return_value=MagicMock(deleted_count=3))
+    monkeypatch.setattr(router, "get_async_db", lambda: {"tasks": collection})
+
+    result = asyncio.run(awrite_many(many_state("delete_many", {"status": "done"})))["result"]
+
+    assert result["deleted_count"] == 3
+
+def test_graph_routes_many_actions():
+    graph = router.get_graph()
+    assert {"update_many", "patch_many", "delete_many"} <= set(graph.nodes)
+
+def test_unconfirmed_many_plan_is_only_previewed(mock_llm, monkeypatch):
+    # Even if the rule planner were trusted with it, "remove user A from role B"
+    # must not become a delete_many over both ids
+    monkeypatch.setattr(router, "RULE_PLANNER_THRESHOLD", 0.0)
+    router.plan_cache.clear()
+    router.plan_templates.table.clear()
+    collection = mock_collection(monkeypatch)
+    collection.count_documents.return_value = 2
+    text = "remove user 68b97d478273e995d0dcdeed from role 68b97d478273e995d0dcdeee"
+
+    result = router.get_graph().invoke(new_crud_state(text))["result"]
+
+    collection.delete_many.assert_not_called()
+    collection.count_documents.assert_called_once()
+    assert result["action"] == "delete_many"
+    assert result["preview"] is True and result["matched_count"] == 2
+
+def test_update_many_refuses_an_empty_filter(monkeypatch):
+    collection = mock_collection(monkeypatch)
+
+    for action, query in (("update_many", None), ("patch_many", {})):
+        result = write_many(many_state(action, query, {"status": "done"}))["result"]
+        assert result["success"] is False
+        assert "Refusing to update every document without a filter" in result["error"]
+
+    state = many_state("patch_many", {}, {"status": "done"})
+    del state["query"]
+    assert write_many(state)["result"]["success"] is False
+    collection.update_many.assert_not_called()
+    collection.count_documents.assert_not_called()